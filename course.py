@@ -1,14 +1,43 @@
+from enrollment import EnrollmentGraph
+
 class Course:
-    def __init__(self, title, name):
+    def __init__(self, title, name, enrollments=None):
         self.title = title
         self.name = name
-        self.enrolled_students = []
+        # Enrollment graph shared with the students and the teaching module; a
+        # course made on its own starts a graph of its own
+        self.enrollments = enrollments if enrollments is not None else EnrollmentGraph()
         self.teacher = None
+        self.announcements = []
+
+    # Live view of the roster in enrollment order; O(1) membership, no copy.
+    # Iterate over get_students() instead when the loop enrolls or deletes students.
+    @property
+    def enrolled_students(self):
+        return self.enrollments.students_of(self)
+
+    # A student enrolled here joins the course's graph if it has none yet
+    def _join(self, student):
+        if student.enrollments is None:
+            student.enrollments = self.enrollments
+        elif student.enrollments is not self.enrollments:
+            raise ValueError(f"{student} belongs to a different enrollment graph than {self}")
 
     def enroll_student(self, student):
-        if student not in self.enrolled_students:
-            self.enrolled_students.append(student)
-            student.add_course(self)
+        self._join(student)
+        return self.enrollments.enroll(self, student)
+
+    def enroll_students(self, students):
+        students = list(students)
+        for student in students:
+            self._join(student)
+        return self.enrollments.enroll_many(self, students)
+
+    def unenroll_student(self, student):
+        return self.enrollments.unenroll(self, student)
+
+    def unenroll_students(self, students):
+        return self.enrollments.unenroll_many(self, students)
 
     def assign_teacher(self, teacher):
         self.teacher = teacher
@@ -16,8 +45,9 @@ class Course:
     def get_teacher(self):
         return self.teacher
 
+    # A snapshot of the roster, safe to iterate while students come and go
     def get_students(self):
-        return self.enrolled_students
+        return list(self.enrolled_students)
 
     def __str__(self):
         return f"{self.title} - {self.name}"
\ No newline at end of file
@@ -0,0 +1,60 @@
+# Bulk course assignment. Each student draws a course with probability
+# proportional to its campus affinity weight, using the Gumbel-max trick over the
+# whole student x course matrix at once. Courses with a capacity accept a random
+# subset of the students that drew them; the rest draw again among the courses
+# that still have seats, so it takes at most one round per course that fills.
+#
+# capacities maps a course to its free seats (missing or None: unlimited).
+# affinity maps a campus to {course: weight}; unlisted courses weigh 1 and a
+# weight of 0 rules the course out for that campus. The same seed gives the
+# same assignment. Returns {course: [students]} and the students left without a
+# course because every course open to them was full.
+def assign_courses(students, courses, capacities=None, affinity=None, seed=None):
+    import numpy as np
+
+    students = list(students)
+    courses = list(courses)
+    n, m = len(students), len(courses)
+    if not n or not m:
+        return {course: [] for course in courses}, students
+    capacities = capacities or {}
+    affinity = affinity or {}
+
+    campuses, campus_codes = np.unique([s.campus for s in students], return_inverse=True)
+    weights = np.ones((len(campuses), m))
+    for row, campus in enumerate(campuses):
+        for column, course in enumerate(courses):
+            weights[row, column] = affinity.get(campus, {}).get(course, 1.0)
+    with np.errstate(divide='ignore'):
+        log_weights = np.log(weights)
+
+    remaining = np.array([np.inf if capacities.get(c) is None else max(capacities[c], 0) for c in courses])
+    rng = np.random.default_rng(seed)
+    assignment = np.full(n, -1)
+    pending = np.arange(n)
+
+    while pending.size and (remaining > 0).any():
+        scores = log_weights[campus_codes[pending]] + rng.gumbel(size=(pending.size, m))
+        scores[:, remaining <= 0] = -np.inf
+        choice = scores.argmax(axis=1)
+        drawn = np.isfinite(scores[np.arange(pending.size), choice])
+        pending, choice = pending[drawn], choice[drawn]
+
+        # Group the draws by course in random order and keep the first free seats' worth
+        order = rng.permutation(pending.size)
+        order = order[np.argsort(choice[order], kind='stable')]
+        chosen = choice[order]
+        rank = np.arange(chosen.size) - np.searchsorted(chosen, chosen)
+        accepted = rank < remaining[chosen]
+        assignment[pending[order[accepted]]] = chosen[accepted]
+        remaining -= np.bincount(chosen[accepted], minlength=m)
+        pending = pending[assignment[pending] == -1]
+
+    result = {course: [] for course in courses}
+    unassigned = []
+    for student, column in zip(students, assignment.tolist()):
+        if column < 0:
+            unassigned.append(student)
+        else:
+            result[courses[column]].append(student)
+    return result, unassigned
@@ -0,0 +1,71 @@
+_EMPTY = {}
+
+
+# Enrollments between courses and students. Each side is a dict of insertion-
+# ordered dicts used as sets, so membership, enrolling and unenrolling are O(1)
+# per edge, and rosters are handed out as live key views instead of copies.
+class EnrollmentGraph:
+    def __init__(self):
+        self._students = {}
+        self._courses = {}
+
+    def enroll(self, course, student):
+        roster = self._students.setdefault(course, {})
+        if student in roster:
+            return False
+        roster[student] = None
+        self._courses.setdefault(student, {})[course] = None
+        return True
+
+    # Enrolls every new student in course; returns how many were added
+    def enroll_many(self, course, students):
+        roster = self._students.setdefault(course, {})
+        added = [s for s in dict.fromkeys(students) if s not in roster]
+        roster.update(dict.fromkeys(added))
+        courses = self._courses
+        for student in added:
+            courses.setdefault(student, {})[course] = None
+        return len(added)
+
+    def unenroll(self, course, student):
+        return self.unenroll_many(course, (student,)) == 1
+
+    def unenroll_many(self, course, students):
+        roster = self._students.get(course, _EMPTY)
+        removed = 0
+        for student in students:
+            if student in roster:
+                del roster[student]
+                self._drop_course(student, course)
+                removed += 1
+        return removed
+
+    def _drop_course(self, student, course):
+        courses = self._courses[student]
+        del courses[course]
+        if not courses:
+            del self._courses[student]
+
+    # Removes every enrollment of student; returns the number of courses they left
+    def remove_student(self, student):
+        courses = self._courses.pop(student, _EMPTY)
+        for course in courses:
+            del self._students[course][student]
+        return len(courses)
+
+    def remove_course(self, course):
+        roster = self._students.pop(course, _EMPTY)
+        for student in roster:
+            self._drop_course(student, course)
+        return len(roster)
+
+    def is_enrolled(self, course, student):
+        return student in self._students.get(course, _EMPTY)
+
+    # Courses without students and students without courses get a shared empty
+    # view, so looking them up costs no entry
+    def students_of(self, course):
+        return self._students.get(course, _EMPTY).keys()
+
+    def courses_of(self, student):
+        return self._courses.get(student, _EMPTY).keys()
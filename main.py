@@ -1,23 +1,15 @@
-import json
 from student import Student
 from course import Course
 from teacher import Teacher
 from teaching_module import TeachingModule
+from student_storage import iter_students
+
+# Builds a student from a saved record; course lists are rebuilt by enrolling
+def student_from_record(first_name, last_name, email, campus, id, enrolled_courses=None):
+    return Student(first_name, last_name, email, campus, student_id=id)
 
 def load_students_from_file(filename):
-    students = []
-    with open(filename, 'r') as file:
-        data = json.load(file)
-        for student_data in data:
-            student = Student(
-                first_name=student_data["first_name"],
-                last_name=student_data["last_name"],
-                email=student_data["email"],
-                campus=student_data["campus"],
-                student_id=student_data["id"]
-            )
-            students.append(student)
-    return students
+    return list(iter_students(filename, student_from_record))
 
 def add_student_menu(teaching_module):
     valid_campuses = ["Christchurch", "Auckland", "Wellington"]
@@ -97,10 +89,18 @@ def list_students_menu(teaching_module):
         print("Invalid choice. Showing unsorted list.")
         return
 
-    students = teaching_module.list_students(sort_by)
+    page_size = 20
+    students = teaching_module.list_students(sort_by, limit=page_size)
     
-    for student in students:
-        print(f"{student.student_id} - {student.first_name} {student.last_name} - {student.email} - {student.campus}")
+    while students:
+        for student in students:
+            print(f"{student.student_id} - {student.first_name} {student.last_name} - {student.email} - {student.campus}")
+        if len(students) < page_size:
+            break
+        more = input("\nPRESS ENTER FOR THE NEXT PAGE OR N TO STOP: ")
+        if more.lower() == 'n':
+            break
+        students = teaching_module.list_students(sort_by, start_after=students[-1], limit=page_size)
 
 def search_student_menu(teaching_module):
     print("\n************************")
@@ -109,12 +109,23 @@ def search_student_menu(teaching_module):
     print("1. SEARCH STUDENT BY ID")
     print("2. SEARCH STUDENT BY FIRST NAME")
     print("3. SEARCH STUDENT BY LAST NAME")
+    print("4. SEARCH STUDENT BY FIRST NAME PREFIX")
+    print("5. SEARCH STUDENT BY LAST NAME PREFIX")
+    print("6. SEARCH STUDENT BY APPROXIMATE NAME")
     choice = input("\nYour Choice: ")
     key = {'1': 'id', '2': 'first_name', '3': 'last_name'}.get(choice)
-
-    if key:
-        value = input(f"Enter {key.replace('_', ' ')}: ")
-        students = teaching_module.search_student(key, value)
+    prefix_key = {'4': 'first_name', '5': 'last_name'}.get(choice)
+
+    if key or prefix_key or choice == '6':
+        if key:
+            value = input(f"Enter {key.replace('_', ' ')}: ")
+            students = teaching_module.search_student(key, value)
+        elif prefix_key:
+            prefix = input(f"Enter the start of the {prefix_key.replace('_', ' ')}: ")
+            students = teaching_module.search_prefix(prefix_key, prefix, limit=20)
+        else:
+            name = input("Enter the name (spelling may be approximate): ")
+            students = teaching_module.search_fuzzy(name, limit=10)
         if students:
             for student in students:
                 print(f"{student.student_id} - {student.first_name} {student.last_name} - {student.email} - {student.campus}")
@@ -157,19 +168,26 @@ def main():
     # Add Teachers
     add_teachers(teaching_module)
 
-# Assign random teachers to courses
-    from random import choice
-    for course in teaching_module.courses:
-        teacher = choice(teaching_module.teachers)
-        course.assign_teacher(teacher)
-
     # Load Students from File
     students = load_students_from_file('students.txt')
     for student in students:
-        teaching_module.students.append(student)
+        teaching_module.register_student(student)
+
+    # Restore saved teachers and enrollments
+    teaching_module.load_courses('courses.txt')
+
+# Assign random teachers to courses that have none yet
+    from random import choice
+    for course in teaching_module.courses:
+        if course.get_teacher() is None:
+            teacher = choice(teaching_module.teachers)
+            course.assign_teacher(teacher)
 
-    # Enroll Students in Random Courses
-    teaching_module.assign_courses_to_students()
+    # Enroll students without a saved course in random courses
+    unassigned = [s for s in teaching_module.students if not s.enrolled_courses]
+    if unassigned:
+        teaching_module.assign_courses_to_students(unassigned)
+        teaching_module.save_courses('courses.txt')
 
     while True:
         print("\n**** Welcome to WHITECLIFFE College of Information Technology ****")
@@ -198,6 +216,7 @@ def main():
             course_index = int(input("Select a course by number: ")) - 1
             teaching_module.view_course_details(course_index)
         elif choice.lower() == 'exit':
+            teaching_module.save_courses('courses.txt')
             break
         else:
             print("Invalid choice. Please try again.")
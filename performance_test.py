@@ -1,10 +1,24 @@
 import json
+import operator
+import heapq
+import os
+import random
+import sys
+import tempfile
 from datetime import datetime
 import timeit
+import tracemalloc
 import matplotlib.pyplot as plt
+from itertools import islice
+from student_index import SortedIndex
+from student_management import Student as CompactStudent
+from student_sorting import external_sort, merge_sort, sort_students
+from student_storage import INTERNED_FIELDS, SymbolTable, iter_records, read_binary_columns, write_binary
 
 # Student class
 class Student:
+    __slots__ = ("first_name", "last_name", "email", "campus", "id")
+
     def __init__(self, first_name, last_name, email, campus, id=None):
         self.first_name = first_name
         self.last_name = last_name
@@ -17,6 +31,10 @@ class Student:
         id = f"{self.first_name[:3]}{self.last_name[:3]}{year}"
         return id
 
+    def to_dict(self):
+        return {"first_name": self.first_name, "last_name": self.last_name, "email": self.email,
+                "campus": self.campus, "id": self.id}
+
 # StudentDatabase class for Solution 1
 class StudentDatabase1:
     def __init__(self, filename):
@@ -33,7 +51,7 @@ class StudentDatabase1:
 
     def save_students(self):
         with open(self.filename, 'w') as file:
-            json.dump([s.__dict__ for s in self.students], file)
+            json.dump([s.to_dict() for s in self.students], file)
 
     def add_student(self, first_name, last_name, email, campus):
         student = Student(first_name, last_name, email, campus)
@@ -66,7 +84,7 @@ class StudentDatabase2:
 
     def save_students(self):
         with open(self.filename, 'w') as file:
-            json.dump([s.__dict__ for s in self.students], file)
+            json.dump([s.to_dict() for s in self.students], file)
 
     def add_student(self, first_name, last_name, email, campus):
         student = Student(first_name, last_name, email, campus)
@@ -137,8 +155,251 @@ def time_operation(db, operation, *args, iterations=10):
     time_taken = timer.timeit(number=iterations) / iterations
     return time_taken
 
+# Synthetic roster for the scaling benchmarks
+# Repeated names share one string, as they do once a loader interns them
+def generate_records(n):
+    campuses = ["Christchurch", "Auckland", "Wellington"]
+    first_names = [f"First{i}" for i in range(5000)]
+    last_names = [f"Last{i}" for i in range(3000)]
+    for i in range(n):
+        yield {
+            "first_name": first_names[i % 5000],
+            "last_name": last_names[i % 3000],
+            "email": f"student{i}@example.com",
+            "campus": campuses[i % 3],
+            "enrolled_courses": [],
+            "id": f"Fir{i:07d}",
+        }
+
+def make_records(n):
+    return list(generate_records(n))
+
+def time_once(operation):
+    timer = timeit.Timer(operation)
+    return timer.timeit(number=1)
+
+# JSON text vs the binary record format for saving and loading a whole roster
+def benchmark_storage(n=1000000):
+    records = make_records(n)
+    with tempfile.TemporaryDirectory() as directory:
+        json_path = os.path.join(directory, "students.txt")
+        binary_path = os.path.join(directory, "students.bin")
+
+        def json_save():
+            with open(json_path, 'w') as file:
+                json.dump(records, file)
+
+        def json_load():
+            with open(json_path, 'r') as file:
+                json.load(file)
+
+        json_save_time = time_once(json_save)
+        json_load_time = time_once(json_load)
+        binary_save_time = time_once(lambda: write_binary(binary_path, records))
+        binary_load_time = time_once(lambda: read_binary_columns(binary_path))
+        json_size = os.path.getsize(json_path)
+        binary_size = os.path.getsize(binary_path)
+
+    print(f"Storage benchmark ({n} records)")
+    print(f"  Save: json {json_save_time:.3f}s, binary {binary_save_time:.3f}s ({json_save_time / binary_save_time:.1f}x)")
+    print(f"  Load: json {json_load_time:.3f}s, binary {binary_load_time:.3f}s ({json_load_time / binary_load_time:.1f}x)")
+    print(f"  Size: json {json_size} bytes, binary {binary_size} bytes")
+
+def make_students(n, seed=0):
+    students = [
+        Student(r["first_name"], r["last_name"], r["email"], r["campus"], r["id"])
+        for r in generate_records(n)
+    ]
+    random.Random(seed).shuffle(students)
+    return students
+
+# Recursive merge sort (Solution 2) vs the iterative merge engine vs built-in sorted
+def benchmark_sorting(n=200000):
+    students = make_students(n)
+    db = StudentDatabase2.__new__(StudentDatabase2)
+    db.students = list(students)
+
+    recursive_time = time_once(lambda: db.list_students("last_name"))
+    engine_time = time_once(lambda: merge_sort(students, "last_name"))
+    sorted_time = time_once(lambda: sorted(students, key=operator.attrgetter("last_name")))
+    multi_engine_time = time_once(lambda: merge_sort(students, ["campus", "last_name"]))
+    multi_sorted_time = time_once(lambda: sorted(students, key=operator.attrgetter("campus", "last_name")))
+
+    print(f"Sorting benchmark ({n} students)")
+    print(f"  last_name: recursive {recursive_time:.3f}s, merge engine {engine_time:.3f}s, sorted {sorted_time:.3f}s")
+    print(f"  campus, last_name: merge engine {multi_engine_time:.3f}s, sorted {multi_sorted_time:.3f}s")
+
+# Whole-file sort in memory vs the external sort under a fixed memory budget
+def benchmark_external_sort(n=1000000, budget_mb=64):
+    records = make_records(n)
+    random.Random(0).shuffle(records)
+    with tempfile.TemporaryDirectory() as directory:
+        source = os.path.join(directory, "students.txt")
+        target = os.path.join(directory, "sorted.txt")
+        with open(source, 'w') as file:
+            json.dump(records, file)
+        del records
+
+        def in_memory():
+            with open(source, 'r') as file:
+                roster = json.load(file)
+            roster.sort(key=operator.itemgetter("last_name"))
+            with open(target, 'w') as file:
+                json.dump(roster, file)
+
+        memory_time = time_once(in_memory)
+        external_time = time_once(lambda: external_sort(source, target, "last_name", budget_mb * 1024 * 1024, temp_dir=directory))
+
+    print(f"External sort benchmark ({n} records, {budget_mb} MB budget, {os.cpu_count()} CPUs)")
+    print(f"  in memory {memory_time:.3f}s, external {external_time:.3f}s")
+
+# First k students by last name: full sort vs bounded heap vs reading a sorted index
+def benchmark_top_k(n=1000000, k=20):
+    sort_key = operator.attrgetter("last_name")
+    print(f"Top-k benchmark (k={k})")
+    size = 10000
+    while size <= n:
+        students = make_students(size)
+        index = SortedIndex("last_name")
+        index.rebuild(students)
+        sort_time = time_once(lambda: sorted(students, key=sort_key)[:k])
+        heap_time = time_once(lambda: heapq.nsmallest(k, students, key=sort_key))
+        index_time = time_once(lambda: list(islice(index, k)))
+        reverse_index_time = time_once(lambda: list(islice(index.descending(), k)))
+        print(f"  {size:>8} students: sorted {sort_time:.4f}s, heap {heap_time:.4f}s, "
+              f"index {index_time:.6f}s, index reversed {reverse_index_time:.6f}s")
+        size *= 10
+
+# sort_students against the comparison merge engine and built-in sorted: bucket
+# sort on campus (3 values), and the sampled fallback to merge_sort on last_name
+def benchmark_distribution_sort(n=10000000, start=100000):
+    size = start
+    print("Distribution sort benchmark")
+    while size <= n:
+        students = make_students(size)
+        for key in ("campus", "last_name"):
+            sort_key = operator.attrgetter(key)
+            merge_time = time_once(lambda: merge_sort(students, key))
+            distribution_time = time_once(lambda: sort_students(students, key))
+            sorted_time = time_once(lambda: sorted(students, key=sort_key))
+            print(f"  {size:>8} students by {key}: merge engine {merge_time:.3f}s, "
+                  f"sort_students {distribution_time:.3f}s, sorted {sorted_time:.3f}s")
+        del students
+        size *= 10
+
+# The Student layout before __slots__: a __dict__ per instance and an always
+# allocated course list
+class DictStudent:
+    def __init__(self, first_name, last_name, email, campus, id, enrolled_courses=None):
+        self.first_name = first_name
+        self.last_name = last_name
+        self.email = email
+        self.campus = campus
+        self.id = id
+        self.enrolled_courses = enrolled_courses if enrolled_courses else []
+
+def allocated_bytes(build):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    roster = build()
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del roster
+    return size
+
+# Bytes per student for each roster layout. The field strings are shared by
+# both, so this measures only what each layout adds on top of them.
+def benchmark_memory(n=1000000):
+    records = make_records(n)
+
+    def fields(r):
+        return r["first_name"], r["last_name"], r["email"], r["campus"], r["id"]
+
+    layouts = {
+        "dict Student": lambda: [DictStudent(*fields(r)) for r in records],
+        "slots Student": lambda: [CompactStudent(*fields(r)) for r in records],
+    }
+    print(f"Memory benchmark ({n} students)")
+    baseline = None
+    for name, build in layouts.items():
+        per_student = allocated_bytes(build) / n
+        baseline = baseline or per_student
+        print(f"  {name}: {per_student:.1f} bytes per student ({per_student / baseline:.0%} of dict Student)")
+
+# Memory of a roster loaded from JSON with and without a shared symbol table for
+# the repeated fields
+def benchmark_interning(n=1000000):
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "students.txt")
+        with open(path, 'w') as file:
+            json.dump(make_records(n), file)
+
+        def load(symbols=None):
+            students = []
+            for r in iter_records(path):
+                if symbols:
+                    for field in INTERNED_FIELDS:
+                        r[field] = symbols.intern(r[field])
+                students.append(CompactStudent(r["first_name"], r["last_name"], r["email"], r["campus"], r["id"]))
+            return students
+
+        symbols = SymbolTable()
+        plain = allocated_bytes(load)
+        interned = allocated_bytes(lambda: load(symbols))
+
+    stats = symbols.stats()
+    print(f"Interning benchmark ({n} students)")
+    print(f"  Loaded roster: plain {plain / n:.1f} bytes per student, interned {interned / n:.1f} ({plain / interned:.2f}x smaller)")
+    print(f"  Symbol table: {stats['symbols']} symbols for {stats['lookups']} values, "
+          f"{stats['saved_bytes'] / 1024 / 1024:.1f} MB of duplicate strings dropped")
+
+# Capacity-aware bulk course assignment: the vectorized draw on its own and the
+# whole TeachingModule call including the enrollment updates
+def benchmark_assignment(n=100000, m=10):
+    from course import Course
+    from course_assignment import assign_courses
+    from enrollment import EnrollmentGraph
+    from student import Student as ModuleStudent
+    from teaching_module import TeachingModule
+
+    enrollments = EnrollmentGraph()
+    module = TeachingModule(enrollments)
+    courses = [Course(f"Course {i}", f"C{i:03d}", enrollments) for i in range(m)]
+    for course in courses:
+        module.add_course(course)
+    for r in make_records(n):
+        module.register_student(ModuleStudent(r["first_name"], r["last_name"], r["email"], r["campus"], r["id"], enrollments))
+    capacities = {course: n // m + n // (4 * m) for course in courses}
+    affinity = {"Auckland": {courses[0]: 3.0}, "Wellington": {courses[1]: 0.0}}
+
+    draw_time = time_once(lambda: assign_courses(module.students, courses, capacities, affinity, seed=0))
+    stdout, sys.stdout = sys.stdout, open(os.devnull, 'w')
+    try:
+        total_time = time_once(lambda: module.assign_courses_to_students(capacities=capacities, affinity=affinity, seed=0))
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+    print(f"Course assignment benchmark ({n} students, {m} courses)")
+    print(f"  draw {draw_time:.3f}s, draw and enroll {total_time:.3f}s")
+
+BENCHMARKS = {
+    "storage": benchmark_storage,
+    "sorting": benchmark_sorting,
+    "external": benchmark_external_sort,
+    "topk": benchmark_top_k,
+    "distribution": benchmark_distribution_sort,
+    "memory": benchmark_memory,
+    "interning": benchmark_interning,
+    "assignment": benchmark_assignment,
+}
+
 # Sample performance test
 if __name__ == "__main__":
+    # e.g. python performance_test.py storage 1000000
+    if len(sys.argv) > 1:
+        BENCHMARKS[sys.argv[1]](*(int(arg) for arg in sys.argv[2:]))
+        sys.exit()
+
     db1 = StudentDatabase1("students1.txt")
     db2 = StudentDatabase2("students2.txt")
 
@@ -1,13 +1,24 @@
 from datetime import datetime
 
 class Student:
-    def __init__(self, first_name, last_name, email, campus, student_id=None):
+    __slots__ = ("first_name", "last_name", "email", "campus", "student_id", "enrollments")
+
+    def __init__(self, first_name, last_name, email, campus, student_id=None, enrollments=None):
         self.first_name = first_name
         self.last_name = last_name
         self.email = email
         self.campus = campus
         self.student_id = student_id if student_id else self.generate_id()
-        self.enrolled_courses = [] 
+        # Enrollment graph of the student's courses, set when they first enroll
+        self.enrollments = enrollments
+
+    # Live view of the student's courses, kept in the enrollment graph; copy it
+    # with list() before enrolling or unenrolling inside a loop over it
+    @property
+    def enrolled_courses(self):
+        if self.enrollments is None:
+            return ()
+        return self.enrollments.courses_of(self)
 
     def __str__(self):
         return f"{self.student_id} - {self.first_name} {self.last_name} - {self.email} - {self.campus}"
@@ -18,8 +29,7 @@ class Student:
         return id
 
     def add_course(self, course):
-        if course not in self.enrolled_courses:
-            self.enrolled_courses.append(course)
+        return course.enroll_student(self)
 
     def receive_announcement(self, announcement):
         print(f"Notification for {self.first_name} {self.last_name}: {announcement}")
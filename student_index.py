@@ -0,0 +1,297 @@
+import heapq
+import math
+from bisect import bisect_left
+from itertools import islice
+
+
+# Exact-match index from a field value to the students that hold it. Each bucket
+# is an insertion-ordered dict used as a set, so removal is O(1) as well.
+class HashIndex:
+    def __init__(self, attribute):
+        self.attribute = attribute
+        self._buckets = {}
+
+    def add(self, student):
+        self._buckets.setdefault(getattr(student, self.attribute), {})[student] = None
+
+    def remove(self, student):
+        value = getattr(student, self.attribute)
+        bucket = self._buckets.get(value)
+        if bucket is not None:
+            bucket.pop(student, None)
+            if not bucket:
+                del self._buckets[value]
+
+    def lookup(self, value):
+        return list(self._buckets.get(value, ()))
+
+    def count(self, value):
+        return len(self._buckets.get(value, ()))
+
+    def contains(self, value, student):
+        return student in self._buckets.get(value, ())
+
+    def rebuild(self, students):
+        self._buckets = {}
+        for student in students:
+            self.add(student)
+
+
+# Hands out unique student IDs in O(1). Taken IDs live in a set, and each base ID
+# remembers the last suffix it gave out, so repeated names get SahKum2024,
+# SahKum2024-2, SahKum2024-3, ... without scanning the roster.
+class IdAllocator:
+    def __init__(self):
+        self._taken = set()
+        self._counters = {}
+
+    def __contains__(self, student_id):
+        return student_id in self._taken
+
+    def __len__(self):
+        return len(self._taken)
+
+    # Reserves student_id, or the next free suffixed form of it if it is taken
+    def allocate(self, student_id):
+        if student_id not in self._taken:
+            self._taken.add(student_id)
+            return student_id
+        n = self._counters.get(student_id, 1)
+        while True:
+            n += 1
+            candidate = f"{student_id}-{n}"
+            if candidate not in self._taken:
+                break
+        self._counters[student_id] = n
+        self._taken.add(candidate)
+        return candidate
+
+    def release(self, student_id):
+        self._taken.discard(student_id)
+
+    def rebuild(self, student_ids):
+        self._taken = set()
+        self._counters = {}
+        return [self.allocate(student_id) for student_id in student_ids]
+
+
+# The smallest string greater than every string starting with prefix, or None
+# for the empty prefix
+def prefix_successor(prefix):
+    if not prefix:
+        return None
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+# Ordered index on one field. Entries are (value, sequence) pairs, so equal values
+# stay in insertion order, kept in a list of sorted buckets of roughly
+# bucket_size entries each. Finding a bucket is a bisect over the bucket maxima,
+# and inserting or removing only shifts one bucket, so updates cost O(log n)
+# comparisons plus O(sqrt n) moves at most.
+class SortedIndex:
+    def __init__(self, attribute, bucket_size=1000):
+        self.attribute = attribute
+        self.bucket_size = bucket_size
+        self._keys = []
+        self._values = []
+        self._maxes = []
+        self._entries = {}
+        self._sequence = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def add(self, student):
+        entry = (getattr(student, self.attribute), self._sequence)
+        self._sequence += 1
+        self._entries[student] = entry
+        if not self._maxes:
+            self._keys.append([entry])
+            self._values.append([student])
+            self._maxes.append(entry)
+            return
+
+        i = bisect_left(self._maxes, entry)
+        if i == len(self._maxes):
+            i -= 1
+            self._keys[i].append(entry)
+            self._values[i].append(student)
+            self._maxes[i] = entry
+        else:
+            j = bisect_left(self._keys[i], entry)
+            self._keys[i].insert(j, entry)
+            self._values[i].insert(j, student)
+
+        if len(self._keys[i]) > 2 * self.bucket_size:
+            half = self.bucket_size
+            self._keys[i:i + 1] = [self._keys[i][:half], self._keys[i][half:]]
+            self._values[i:i + 1] = [self._values[i][:half], self._values[i][half:]]
+            self._maxes[i:i + 1] = [self._keys[i][-1], self._keys[i + 1][-1]]
+
+    def remove(self, student):
+        entry = self._entries.pop(student, None)
+        if entry is None:
+            return
+        i = bisect_left(self._maxes, entry)
+        j = bisect_left(self._keys[i], entry)
+        del self._keys[i][j]
+        del self._values[i][j]
+        if not self._keys[i]:
+            del self._keys[i]
+            del self._values[i]
+            del self._maxes[i]
+        else:
+            self._maxes[i] = self._keys[i][-1]
+
+    def rebuild(self, students):
+        students = list(students)
+        attribute = self.attribute
+        entries = sorted((getattr(s, attribute), i) for i, s in enumerate(students))
+        self._sequence = len(entries)
+        self._entries = {}
+        self._keys = []
+        self._values = []
+        for start in range(0, len(entries), self.bucket_size):
+            keys = entries[start:start + self.bucket_size]
+            values = [students[i] for _, i in keys]
+            self._keys.append(keys)
+            self._values.append(values)
+            self._entries.update(zip(values, keys))
+        self._maxes = [keys[-1] for keys in self._keys]
+
+    # Yields (entry, student) pairs in order, starting at the first entry >= start
+    def _iter_from(self, start):
+        i = bisect_left(self._maxes, start)
+        if i == len(self._maxes):
+            return
+        j = bisect_left(self._keys[i], start)
+        for keys, values in zip(self._keys[i:], self._values[i:]):
+            for k in range(j, len(keys)):
+                yield keys[k], values[k]
+            j = 0
+
+    # Number of entries that sort before entry
+    def _rank(self, entry):
+        i = bisect_left(self._maxes, entry)
+        if i == len(self._maxes):
+            return len(self._entries)
+        return sum(map(len, self._keys[:i])) + bisect_left(self._keys[i], entry)
+
+    # Entry bounds covering the values between low and high; None leaves a side open
+    @staticmethod
+    def _bounds(low, high, low_inclusive=True, high_inclusive=True):
+        start = None if low is None else (low,) if low_inclusive else (low, math.inf)
+        stop = None if high is None else (high, math.inf) if high_inclusive else (high,)
+        return start, stop
+
+    # Students with low <= value <= high (or strict bounds), in sorted order.
+    # after resumes just past that student, for cursor-based paging.
+    def range(self, low=None, high=None, low_inclusive=True, high_inclusive=True, after=None):
+        start, stop = self._bounds(low, high, low_inclusive, high_inclusive)
+        cursor = None
+        if after is not None:
+            cursor = self._entries.get(after)
+            if cursor is None:
+                raise ValueError("The cursor student is no longer in the index")
+            if start is None or cursor > start:
+                start = cursor
+        for entry, student in self._iter_from(start or ()):
+            if stop is not None and entry >= stop:
+                return
+            if entry != cursor:
+                yield student
+
+    def count_range(self, low=None, high=None, low_inclusive=True, high_inclusive=True):
+        start, stop = self._bounds(low, high, low_inclusive, high_inclusive)
+        first = 0 if start is None else self._rank(start)
+        last = len(self._entries) if stop is None else self._rank(stop)
+        return max(last - first, 0)
+
+    # All students whose value equals value, in insertion order
+    def lookup(self, value):
+        return list(self.range(value, value))
+
+    def count(self, value):
+        return self.count_range(value, value)
+
+    # The first limit students whose value starts with prefix, in sorted order
+    def prefix(self, prefix, limit=None):
+        return list(islice(self.range(prefix, prefix_successor(prefix), high_inclusive=False), limit))
+
+    def count_prefix(self, prefix):
+        return self.count_range(prefix, prefix_successor(prefix), high_inclusive=False)
+
+    def __iter__(self):
+        for values in self._values:
+            yield from values
+
+    # Students in descending order of value; equal values keep insertion order,
+    # as in sorted(..., reverse=True)
+    def descending(self):
+        if not self._maxes:
+            return
+        value = self._maxes[-1][0]
+        while True:
+            yield from self.range(value, value)
+            i = bisect_left(self._maxes, (value,))
+            j = bisect_left(self._keys[i], (value,))
+            if j:
+                value = self._keys[i][j - 1][0]
+            elif i:
+                value = self._maxes[i - 1][0]
+            else:
+                return
+
+
+def full_name(student):
+    return f"{student.first_name} {student.last_name}"
+
+
+def trigrams(text):
+    padded = f"  {text.lower()} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+# Inverted index from character trigrams to students, for misspelled lookups.
+# Candidates share at least one trigram with the query and are ranked by the
+# Dice coefficient of the two trigram sets.
+class TrigramIndex:
+    def __init__(self, text, min_similarity=0.3):
+        self.text = text
+        self.min_similarity = min_similarity
+        self._postings = {}
+        self._grams = {}
+
+    def add(self, student):
+        grams = trigrams(self.text(student))
+        self._grams[student] = grams
+        for gram in grams:
+            self._postings.setdefault(gram, {})[student] = None
+
+    def remove(self, student):
+        for gram in self._grams.pop(student, ()):
+            posting = self._postings[gram]
+            posting.pop(student, None)
+            if not posting:
+                del self._postings[gram]
+
+    def rebuild(self, students):
+        self._postings = {}
+        self._grams = {}
+        for student in students:
+            self.add(student)
+
+    def search(self, query, limit=10):
+        query_grams = trigrams(query)
+        shared = {}
+        for gram in query_grams:
+            for student in self._postings.get(gram, ()):
+                shared[student] = shared.get(student, 0) + 1
+
+        scored = []
+        for student, count in shared.items():
+            score = 2 * count / (len(query_grams) + len(self._grams[student]))
+            if score >= self.min_similarity:
+                scored.append((score, student))
+        best = heapq.nlargest(limit, scored, key=lambda pair: pair[0])
+        return [student for _, student in best]
@@ -1,16 +1,41 @@
+import glob
+import heapq
+import operator
 import json
+import os
+import sqlite3
+import weakref
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime
+from itertools import islice, repeat
+from student_index import HashIndex, IdAllocator, SortedIndex, TrigramIndex, full_name, prefix_successor
+from student_query import QueryPlan, parse_filters
+from student_sorting import SortedViewCache
+from student_storage import RECORD_FIELDS, PersistentRoster, atomic_write, iter_records, iter_students, read_binary_columns, students_from_columns, write_binary
 
-# Student class
+# Student class. Slots instead of a per-instance __dict__ keep large rosters
+# compact; the course list is only allocated once a student is enrolled.
 class Student:
+    __slots__ = ("first_name", "last_name", "email", "campus", "id", "_enrolled_courses", "__weakref__")
+
     def __init__(self, first_name, last_name, email, campus, id=None, enrolled_courses=None):
         self.first_name = first_name
         self.last_name = last_name
         self.email = email
         self.campus = campus
         self.id = id if id else self.generate_id()
-        self.enrolled_courses = enrolled_courses if enrolled_courses else []
+        self._enrolled_courses = enrolled_courses if enrolled_courses else None
+
+    @property
+    def enrolled_courses(self):
+        if self._enrolled_courses is None:
+            self._enrolled_courses = []
+        return self._enrolled_courses
 
+    @enrolled_courses.setter
+    def enrolled_courses(self, courses):
+        self._enrolled_courses = courses if courses else None
 
     def generate_id(self):
         year = datetime.now().year
@@ -24,41 +49,511 @@ class Student:
     def receive_announcement(self, announcement):
         print(f"Notification for {self.first_name} {self.last_name}: {announcement}")
 
+    # The saved record, as written to students.txt and the journal
+    def to_dict(self):
+        return {
+            "first_name": self.first_name,
+            "last_name": self.last_name,
+            "email": self.email,
+            "campus": self.campus,
+            "id": self.id,
+            "enrolled_courses": list(self._enrolled_courses or ()),
+        }
+
     def __str__(self):
         return f"{self.first_name} {self.last_name} - {self.email} - {self.campus}"
 
+# Reads a roster file into columns, which pickle far cheaper than Student objects
+def load_student_columns(path, storage="json"):
+    if storage == "binary":
+        return read_binary_columns(path)
+    columns = {field: [] for field in RECORD_FIELDS}
+    for record in iter_records(path):
+        for field, column in columns.items():
+            column.append(record.get(field))
+    return columns
+
+def load_students_file(path, storage="json"):
+    if storage == "binary":
+        return students_from_columns(read_binary_columns(path), Student)
+    return list(iter_students(path, Student))
+
+def save_students_file(path, students, storage="json"):
+    records = [s.to_dict() for s in students]
+    if storage == "binary":
+        write_binary(path, records)
+    else:
+        with atomic_write(path) as file:
+            json.dump(records, file)
+
+# Cuts a page out of an already sorted list
+def page(students, key, start_after=None, limit=None, low=None, high=None):
+    if start_after is not None:
+        position = next((i for i, s in enumerate(students) if s is start_after), None)
+        if position is None:
+            raise ValueError("The cursor student is not in this listing")
+        students = students[position + 1:]
+    if low is not None or high is not None:
+        students = [
+            s for s in students
+            if (low is None or getattr(s, key) >= low) and (high is None or getattr(s, key) <= high)
+        ]
+    return students if limit is None else students[:limit]
+
 # StudentDatabase class
-class StudentDatabase:
+class StudentDatabase(PersistentRoster):
+    student_class = Student
+    # Fields kept in a hash index for exact-match search_student lookups;
+    # add_index declares more on an instance, e.g. campus
+    indexed_fields = ("id", "first_name", "last_name", "email")
+    # Fields kept in a sorted index, for search_prefix and paged list_students;
+    # add_sorted_index declares more on an instance
+    sorted_fields = ("id", "first_name", "last_name", "email", "campus")
+    # Fields search_fuzzy accepts, mapped to the text their trigram index covers
+    fuzzy_fields = {"name": full_name, "email": operator.attrgetter("email")}
+
+    def __init__(self, filename, journal=False, compact_threshold=1024 * 1024, storage="json",
+                 write_behind=None, sharded=False):
+        if storage not in ("json", "binary"):
+            raise ValueError(f"Unknown storage format: {storage}")
+        if journal and write_behind is not None:
+            raise ValueError("journal and write_behind are alternative persistence modes")
+        if journal and sharded:
+            raise ValueError("journal mode does not support sharded storage")
+        self.storage = storage
+        # When sharded, each campus is kept in its own file and its own list
+        self.sharded = sharded
+        self.shards = None
+        self._dirty_shards = set()
+        self._open(filename, journal, compact_threshold)
+        # Bumped on every add and delete; cached sorted views from older generations are stale
+        self.generation = 0
+        self.view_cache = SortedViewCache()
+        self.indexes = {}
+        for field in self.indexed_fields:
+            self.add_index(field)
+        self.sorted_indexes = {}
+        for field in self.sorted_fields:
+            self.add_sorted_index(field)
+        # Trigram indexes for search_fuzzy, built the first time a field is searched
+        self.fuzzy_indexes = {}
+        self._start_saver(write_behind)
+
+    def _read_students(self):
+        if self.sharded:
+            return self._load_shards()
+        return load_students_file(self.filename, self.storage)
+
+    def save_students(self):
+        with self._lock:
+            if self.sharded:
+                self._save_shards()
+                return
+            save_students_file(self.filename, list(self.students), self.storage)
+            if self.journal:
+                self.journal.clear()
+
+    def _shard_path(self, campus):
+        root, ext = os.path.splitext(self.filename)
+        return f"{root}.{campus}{ext}"
+
+    def _shard_paths(self):
+        root, ext = os.path.splitext(self.filename)
+        paths = glob.glob(f"{glob.escape(root)}.*{glob.escape(ext)}")
+        return {path[len(root) + 1:len(path) - len(ext)]: path for path in sorted(paths)}
+
+    # Loads every campus file, in parallel worker processes when there is more than one
+    # file and CPU. Workers send back columns and the students are built here.
+    def _load_shards(self):
+        paths = self._shard_paths()
+        workers = min(len(paths), os.cpu_count() or 1)
+        if not paths:
+            # Split an existing single-file roster into shards on the next save
+            try:
+                students = load_students_file(self.filename, self.storage)
+            except FileNotFoundError:
+                students = []
+            self._dirty_shards.update(s.campus for s in students)
+        elif workers == 1:
+            students = [s for path in paths.values() for s in load_students_file(path, self.storage)]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                loaded = list(pool.map(load_student_columns, paths.values(), repeat(self.storage)))
+            students = [s for columns in loaded for s in students_from_columns(columns, Student)]
+        self._rebuild_shards(students)
+        return students
+
+    def _rebuild_shards(self, students):
+        self.shards = {}
+        for student in students:
+            self.shards.setdefault(student.campus, []).append(student)
+
+    # Rewrites only the campus files that changed since the last save
+    def _save_shards(self):
+        dirty, self._dirty_shards = self._dirty_shards, set()
+        for campus in dirty:
+            save_students_file(self._shard_path(campus), list(self.shards.get(campus, [])), self.storage)
+
+    def add_index(self, field):
+        index = HashIndex(field)
+        index.rebuild(self.students)
+        self.indexes[field] = index
+
+    def add_sorted_index(self, field):
+        index = SortedIndex(field)
+        index.rebuild(self.students)
+        self.sorted_indexes[field] = index
+
+    def _all_indexes(self):
+        return [*self.indexes.values(), *self.sorted_indexes.values(), *self.fuzzy_indexes.values()]
+
+    # Renamed students in a sharded roster mark their campus file for the next save
+    def _claim_ids(self, students):
+        renamed = super()._claim_ids(students)
+        if self.sharded:
+            self._dirty_shards.update(s.campus for s in renamed)
+        return renamed
+
+    def _rebuild_indexes(self):
+        self.generation += 1
+        for index in self._all_indexes():
+            index.rebuild(self.students)
+
+    def _index(self, student):
+        self.generation += 1
+        for index in self._all_indexes():
+            index.add(student)
+        if self.sharded:
+            self.shards.setdefault(student.campus, []).append(student)
+            self._dirty_shards.add(student.campus)
+
+    def _unindex(self, deleted):
+        self.generation += 1
+        for student in deleted:
+            for index in self._all_indexes():
+                index.remove(student)
+        if self.sharded:
+            deleted = set(deleted)
+            for campus in {s.campus for s in deleted}:
+                self.shards[campus] = [s for s in self.shards[campus] if s not in deleted]
+                self._dirty_shards.add(campus)
+
+    def _restore(self, students):
+        super()._restore(students)
+        if self.sharded:
+            self._rebuild_shards(students)
+
+    # With campus given, a sharded database only sorts that campus. Otherwise each
+    # shard is sorted on its own and the sorted runs are merged.
+    # Paging: pass the last student of the previous page as start_after and a page
+    # size as limit; low/high restrict the key to a range (inclusive). Keys with a
+    # sorted index jump straight to the page in O(log n + page size).
+    def list_students(self, key=None, campus=None, start_after=None, limit=None, low=None, high=None):
+        # Whole listings are cached as tuples until the next add or delete; callers get their own list
+        if campus is None and start_after is None and limit is None and low is None and high is None:
+            students = self.view_cache.get(key, self.generation)
+            if students is None:
+                students = tuple(self._list_students(key))
+                self.view_cache.put(key, self.generation, students)
+            return list(students)
+        return self._list_students(key, campus, start_after, limit, low, high)
+
+    def _list_students(self, key, campus=None, start_after=None, limit=None, low=None, high=None):
+        index = self.sorted_indexes.get(key)
+        if index is not None and not (self.sharded and campus is not None):
+            students = index.range(low, high, after=start_after)
+            if campus is not None:
+                students = (s for s in students if s.campus == campus)
+            return list(islice(students, limit))
+
+        sort_key = lambda s: getattr(s, key)
+        if not self.sharded:
+            students = self.students if campus is None else self.search_student("campus", campus)
+            students = sorted(students, key=sort_key)
+        elif campus is not None:
+            students = sorted(self.shards.get(campus, []), key=sort_key)
+        else:
+            runs = [sorted(shard, key=sort_key) for shard in self.shards.values()]
+            students = list(heapq.merge(*runs, key=sort_key))
+        return page(students, key, start_after, limit, low, high)
+
+    # The first k students by key (the last k when reverse) without sorting the
+    # whole roster: read off the sorted index, or keep a bounded heap of k
+    def top_k(self, key, k, reverse=False):
+        index = self.sorted_indexes.get(key)
+        if index is not None:
+            return list(islice(index.descending() if reverse else index, k))
+        select = heapq.nlargest if reverse else heapq.nsmallest
+        return select(k, self.students, key=operator.attrgetter(key))
+
+    def nsmallest(self, k, key):
+        return self.top_k(key, k)
+
+    def nlargest(self, k, key):
+        return self.top_k(key, k, reverse=True)
+
+    def search_student(self, key, value, campus=None):
+        index = self.indexes.get(key)
+        if index is not None:
+            students = index.lookup(value)
+            return students if campus is None else [s for s in students if s.campus == campus]
+        if self.sharded:
+            if key == "campus":
+                return list(self.shards.get(value, []))
+            if campus is not None:
+                return [s for s in self.shards.get(campus, []) if getattr(s, key) == value]
+        students = self.students
+        if campus is not None:
+            students = [s for s in students if s.campus == campus]
+        return [s for s in students if getattr(s, key) == value]
+
+    # Type-ahead lookup: the first limit students whose field starts with prefix
+    def search_prefix(self, field, prefix, limit=10):
+        index = self.sorted_indexes.get(field)
+        if index is not None:
+            return index.prefix(prefix, limit)
+        matches = [s for s in self.students if getattr(s, field).startswith(prefix)]
+        return sorted(matches, key=lambda s: getattr(s, field))[:limit]
+
+    # Misspelling-tolerant search over "name" (first and last) or "email",
+    # best matches first
+    def search_fuzzy(self, value, field="name", limit=10):
+        index = self.fuzzy_indexes.get(field)
+        if index is None:
+            index = TrigramIndex(self.fuzzy_fields[field])
+            index.rebuild(self.students)
+            self.fuzzy_indexes[field] = index
+        return index.search(value, limit)
+
+    # Multi-field search, e.g.
+    #   db.query(campus="Auckland", last_name__prefix="Ku", order_by="first_name", limit=50)
+    # Filters are field=value or field__op=value with op one of eq, in, prefix, gt, gte, lt, lte.
+    def query(self, order_by=None, limit=None, **filters):
+        return QueryPlan(self, parse_filters(filters), order_by, limit).execute()
+
+    # The plan query() would use for the same arguments
+    def explain(self, order_by=None, limit=None, **filters):
+        return str(QueryPlan(self, parse_filters(filters), order_by, limit))
+
+# StudentDatabase stored in SQLite, with B-tree indexes on the searchable columns
+class SQLiteStudentDatabase:
+    COLUMNS = ("first_name", "last_name", "email", "campus", "id", "enrolled_courses")
+    INDEXED_COLUMNS = ("first_name", "last_name", "campus")
+    # SQL for the query() operators that map onto a single comparison
+    SQL_OPERATORS = {"eq": "=", "gt": ">", "gte": ">=", "lt": "<", "lte": "<="}
+
     def __init__(self, filename):
         self.filename = filename
-        self.students = self.load_students()
+        self.connection = sqlite3.connect(filename)
+        self._in_batch = False
+        # Row of each Student handed out, so it can serve as a paging cursor
+        self._rowids = weakref.WeakKeyDictionary()
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS students ("
+            "first_name TEXT, last_name TEXT, email TEXT, campus TEXT, id TEXT, enrolled_courses TEXT)"
+        )
+        for column in self.INDEXED_COLUMNS:
+            self.connection.execute(f"CREATE INDEX IF NOT EXISTS students_{column} ON students ({column})")
+        # Opening never rewrites rows: repeated IDs from older files stay as they
+        # are, with a plain index on id, until migrate_ids() renames them
+        self.ids = IdAllocator()
+        if self._load_ids():
+            self.connection.execute("CREATE INDEX IF NOT EXISTS students_id ON students (id)")
+        else:
+            self.connection.execute("CREATE UNIQUE INDEX IF NOT EXISTS students_id_unique ON students (id)")
+        self.connection.commit()
 
-    def load_students(self):
-        try:
-            with open(self.filename, 'r') as file:
-                students = json.load(file)
-                return [Student(**s) for s in students]
-        except FileNotFoundError:
-            return []
+    # Reserves every stored ID in the allocator; reports whether any is repeated
+    def _load_ids(self):
+        stored = [student_id for student_id, in self.connection.execute("SELECT id FROM students ORDER BY rowid")]
+        return self.ids.rebuild(stored) != stored
 
-    def save_students(self):
-        with open(self.filename, 'w') as file:
-            json.dump([s.__dict__ for s in self.students], file)
+    # Suffixes repeated IDs in rowid order and makes id unique from then on;
+    # returns how many students were renamed
+    def migrate_ids(self):
+        rows = self.connection.execute("SELECT rowid, id FROM students ORDER BY rowid").fetchall()
+        allocated = self.ids.rebuild(student_id for _, student_id in rows)
+        renamed = [(new, rowid) for (rowid, old), new in zip(rows, allocated) if new != old]
+        self.connection.executemany("UPDATE students SET id = ? WHERE rowid = ?", renamed)
+        self.connection.execute("DROP INDEX IF EXISTS students_id")
+        self.connection.execute("CREATE UNIQUE INDEX IF NOT EXISTS students_id_unique ON students (id)")
+        self._commit()
+        return len(renamed)
+
+    @property
+    def students(self):
+        return self._select("ORDER BY rowid")
+
+    def _select_sql(self, clause):
+        return f"SELECT rowid, {', '.join(self.COLUMNS)} FROM students {clause}"
+
+    def _select(self, clause, params=()):
+        rows = self.connection.execute(self._select_sql(clause), params)
+        students = []
+        for row in rows:
+            student = Student(*row[1:6], json.loads(row[6]))
+            self._rowids[student] = row[0]
+            students.append(student)
+        return students
+
+    def _check_column(self, key):
+        if key not in self.COLUMNS:
+            raise ValueError(f"Unknown student field: {key}")
+
+    def _insert(self, students):
+        rows = []
+        for s in students:
+            s.id = self.ids.allocate(s.id)
+            rows.append((s.first_name, s.last_name, s.email, s.campus, s.id, json.dumps(s.enrolled_courses)))
+        self.connection.executemany(f"INSERT INTO students ({', '.join(self.COLUMNS)}) VALUES (?, ?, ?, ?, ?, ?)", rows)
+
+    def _commit(self):
+        if not self._in_batch:
+            self.connection.commit()
+
+    # One-off import of an existing students.txt
+    def import_json(self, path):
+        self._insert(iter_students(path, Student))
+        self._commit()
 
     def add_student(self, first_name, last_name, email, campus):
-        student = Student(first_name, last_name, email, campus)
-        self.students.append(student)
-        self.save_students()
+        self._insert([Student(first_name, last_name, email, campus)])
+        self._commit()
 
+    # Removes at most one student, the first stored, even before migrate_ids()
     def delete_student(self, student_id):
-        self.students = [s for s in self.students if s.id != student_id]
-        self.save_students()
+        self.delete_students([student_id])
+
+    def add_students(self, students):
+        self._insert(Student(*details) for details in students)
+        self._commit()
+
+    def delete_students(self, student_ids):
+        student_ids = list(student_ids)
+        self.connection.executemany(
+            "DELETE FROM students WHERE rowid = (SELECT rowid FROM students WHERE id = ? ORDER BY rowid LIMIT 1)",
+            [(i,) for i in student_ids]
+        )
+        for student_id in student_ids:
+            if self.connection.execute("SELECT 1 FROM students WHERE id = ?", (student_id,)).fetchone() is None:
+                self.ids.release(student_id)
+        self._commit()
+
+    # Runs the block as one transaction
+    @contextmanager
+    def batch(self):
+        if self._in_batch:
+            yield self
+            return
+        self._in_batch = True
+        try:
+            yield self
+        except BaseException:
+            self.connection.rollback()
+            self._load_ids()
+            raise
+        else:
+            self.connection.commit()
+        finally:
+            self._in_batch = False
+
+    def list_students(self, key=None, start_after=None, limit=None, low=None, high=None):
+        if key is None:
+            return page(self.students, key, start_after, limit)
+        self._check_column(key)
+        conditions, params = [], []
+        if low is not None:
+            conditions.append(f"{key} >= ?")
+            params.append(low)
+        if high is not None:
+            conditions.append(f"{key} <= ?")
+            params.append(high)
+        if start_after is not None:
+            # Keyset paging on (key, rowid), which the index on key already orders
+            conditions.append(f"({key}, rowid) > (?, ?)")
+            params += [getattr(start_after, key), self._rowids[start_after]]
+        where = f"WHERE {' AND '.join(conditions)} " if conditions else ""
+        return self._select(f"{where}ORDER BY {key}, rowid LIMIT ?", (*params, -1 if limit is None else limit))
 
-    def list_students(self, key=None):
-        return sorted(self.students, key=lambda s: getattr(s, key))
+    def top_k(self, key, k, reverse=False):
+        self._check_column(key)
+        return self._select(f"ORDER BY {key} {'DESC' if reverse else 'ASC'}, rowid LIMIT ?", (k,))
+
+    def nsmallest(self, k, key):
+        return self.top_k(key, k)
+
+    def nlargest(self, k, key):
+        return self.top_k(key, k, reverse=True)
 
     def search_student(self, key, value):
-        return [s for s in self.students if getattr(s, key) == value]
+        self._check_column(key)
+        return self._select(f"WHERE {key} = ? ORDER BY rowid", (value,))
+
+    def search_prefix(self, field, prefix, limit=10):
+        self._check_column(field)
+        if not prefix:
+            return self._select(f"ORDER BY {field}, rowid LIMIT ?", (limit,))
+        # Every value starting with prefix sorts between prefix and its successor
+        return self._select(
+            f"WHERE {field} >= ? AND {field} < ? ORDER BY {field}, rowid LIMIT ?",
+            (prefix, prefix_successor(prefix), limit)
+        )
+
+    # Same filters and ordering as StudentDatabase.query, run as one SELECT so
+    # SQLite picks the index. Without order_by rows come in insertion order.
+    def query(self, order_by=None, limit=None, **filters):
+        return self._select(*self._query_clause(order_by, limit, filters))
+
+    # SQLite's plan for the same arguments, one step per line
+    def explain(self, order_by=None, limit=None, **filters):
+        clause, params = self._query_clause(order_by, limit, filters)
+        rows = self.connection.execute(f"EXPLAIN QUERY PLAN {self._select_sql(clause)}", params)
+        return "\n".join(row[3] for row in rows)
+
+    def _query_clause(self, order_by, limit, filters):
+        conditions, params = [], []
+        for predicate in parse_filters(filters):
+            field, value = predicate.field, predicate.value
+            self._check_column(field)
+            if predicate.op == "in":
+                values = sorted(value)
+                conditions.append(f"{field} IN ({', '.join('?' * len(values))})")
+                params += values
+            elif predicate.op == "prefix":
+                if value:
+                    conditions.append(f"{field} >= ? AND {field} < ?")
+                    params += [value, prefix_successor(value)]
+            else:
+                conditions.append(f"{field} {self.SQL_OPERATORS[predicate.op]} ?")
+                params.append(value)
+        where = f"WHERE {' AND '.join(conditions)} " if conditions else ""
+        if order_by is None:
+            order = "ORDER BY rowid"
+        else:
+            self._check_column(order_by)
+            order = f"ORDER BY {order_by}, rowid"
+        return f"{where}{order} LIMIT ?", (*params, -1 if limit is None else limit)
+
+    # SQLite has no trigram index here, so this ranks a scan of every row
+    def search_fuzzy(self, value, field="name", limit=10):
+        index = TrigramIndex(full_name if field == "name" else operator.attrgetter(field))
+        index.rebuild(self.students)
+        return index.search(value, limit)
+
+    def close(self):
+        self.connection.close()
+
+# Opens a roster with the given backend: "file" for a StudentDatabase, which
+# takes its options as keywords, or "sqlite" for a SQLiteStudentDatabase, which
+# has none and rejects any given
+def open_database(filename, backend="file", **options):
+    if backend == "file":
+        return StudentDatabase(filename, **options)
+    if backend == "sqlite":
+        if options:
+            raise ValueError(f"The sqlite backend does not support: {', '.join(sorted(options))}")
+        return SQLiteStudentDatabase(filename)
+    raise ValueError(f"Unknown backend: {backend}")
 
 # Functions for Menu Operations
 def add_student_menu(db):
@@ -99,9 +594,9 @@ def delete_student_menu(db):
         student_id = input("Enter student ID to delete the record: ")
 
         # Check if the student exists
-        student = next((s for s in db.students if s.id == student_id), None)
+        student = db.search_student("id", student_id)
 
-        if student is None:
+        if not student:
             print(f"*** No student found with ID {student_id}. ***")
             return
         else:
@@ -127,13 +622,21 @@ def list_students_menu(db):
     key = {'1': 'id', '2': 'first_name', '3': 'last_name', '4': 'campus'}.get(choice)
 
     if key:
-        students = db.list_students(key)
+        page_size = 20
+        students = db.list_students(key, limit=page_size)
         if students:
             print()
-            for student in students:
-                print(f"{student.id} - {student.first_name} {student.last_name} - {student.email} - {student.campus}")
         else:
             print("No students found.")
+        while students:
+            for student in students:
+                print(f"{student.id} - {student.first_name} {student.last_name} - {student.email} - {student.campus}")
+            if len(students) < page_size:
+                break
+            more = input("\nPRESS ENTER FOR THE NEXT PAGE OR N TO STOP: ")
+            if more.lower() == 'n':
+                break
+            students = db.list_students(key, start_after=students[-1], limit=page_size)
     else:
         print("Invalid choice. Returning to main menu.")
         return
@@ -145,12 +648,23 @@ def search_student_menu(db):
     print("1. SEARCH STUDENT BY ID")
     print("2. SEARCH STUDENT BY FIRST NAME")
     print("3. SEARCH STUDENT BY LAST NAME")
+    print("4. SEARCH STUDENT BY FIRST NAME PREFIX")
+    print("5. SEARCH STUDENT BY LAST NAME PREFIX")
+    print("6. SEARCH STUDENT BY APPROXIMATE NAME")
     choice = input("\nYour Choice: ")
     key = {'1': 'id', '2': 'first_name', '3': 'last_name'}.get(choice)
+    prefix_key = {'4': 'first_name', '5': 'last_name'}.get(choice)
 
-    if key:
-        value = input(f"Enter {key.replace('_', ' ')}: ")
-        students = db.search_student(key, value)
+    if key or prefix_key or choice == '6':
+        if key:
+            value = input(f"Enter {key.replace('_', ' ')}: ")
+            students = db.search_student(key, value)
+        elif prefix_key:
+            prefix = input(f"Enter the start of the {prefix_key.replace('_', ' ')}: ")
+            students = db.search_prefix(prefix_key, prefix, limit=20)
+        else:
+            name = input("Enter the name (spelling may be approximate): ")
+            students = db.search_fuzzy(name, limit=10)
         if students:
             for student in students:
                 print(f"{student.id} - {student.first_name} {student.last_name} - {student.email} - {student.campus}")
@@ -182,6 +696,7 @@ def main():
         elif choice == '4':
             search_student_menu(db)
         elif choice.lower() == 'exit':
+            db.close()
             break
         else:
             print("Invalid choice. Please try again.")
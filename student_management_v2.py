@@ -1,100 +1,115 @@
 import json
 from datetime import datetime
+from student_index import SortedIndex
+from student_sorting import SortedViewCache, sort_students
+from student_storage import PersistentRoster, atomic_write, iter_students, read_binary_columns, students_from_columns, write_binary
 
 class Student:
+    __slots__ = ("first_name", "last_name", "email", "campus", "id", "_enrolled_courses")
+
     def __init__(self, first_name, last_name, email, campus, id=None, enrolled_courses=None):
         self.first_name = first_name
         self.last_name = last_name
         self.email = email
         self.campus = campus
         self.id = id if id else self.generate_id()
-        self.enrolled_courses = enrolled_courses if enrolled_courses else []
+        self._enrolled_courses = enrolled_courses if enrolled_courses else None
+
+    # Allocated on first use, so students without courses carry no list
+    @property
+    def enrolled_courses(self):
+        if self._enrolled_courses is None:
+            self._enrolled_courses = []
+        return self._enrolled_courses
+
+    @enrolled_courses.setter
+    def enrolled_courses(self, courses):
+        self._enrolled_courses = courses if courses else None
 
     def generate_id(self):
         year = datetime.now().year
         id = f"{self.first_name[:3]}{self.last_name[:3]}{year}"
         return id
 
+    def to_dict(self):
+        return {
+            "first_name": self.first_name,
+            "last_name": self.last_name,
+            "email": self.email,
+            "campus": self.campus,
+            "id": self.id,
+            "enrolled_courses": list(self._enrolled_courses or ()),
+        }
+
 # StudentDatabase class with different algorithms
-class StudentDatabase:
-    def __init__(self, filename):
-        self.filename = filename
-        self.students = self.load_students()
-
-    def load_students(self):
-        try:
-            with open(self.filename, 'r') as file:
-                students = json.load(file)
-                return [Student(**s) for s in students]
-        except FileNotFoundError:
-            return []
+class StudentDatabase(PersistentRoster):
+    student_class = Student
+    # Keys with a maintained sorted index, so searches never re-sort the roster
+    sorted_fields = ("id", "first_name", "last_name", "campus")
+
+    def __init__(self, filename, journal=False, compact_threshold=1024 * 1024, storage="json", write_behind=None):
+        if storage not in ("json", "binary"):
+            raise ValueError(f"Unknown storage format: {storage}")
+        if journal and write_behind is not None:
+            raise ValueError("journal and write_behind are alternative persistence modes")
+        self.storage = storage
+        self._open(filename, journal, compact_threshold)
+        # Bumped on every add and delete; cached sorted views from older generations are stale
+        self.generation = 0
+        self.view_cache = SortedViewCache()
+        self.sorted_indexes = {field: SortedIndex(field) for field in self.sorted_fields}
+        self._rebuild_indexes()
+        self._start_saver(write_behind)
+
+    def _read_students(self):
+        if self.storage == "binary":
+            return students_from_columns(read_binary_columns(self.filename), Student)
+        return list(iter_students(self.filename, Student))
 
     def save_students(self):
-        with open(self.filename, 'w') as file:
-            json.dump([s.__dict__ for s in self.students], file)
-
-    def add_student(self, first_name, last_name, email, campus):
-        student = Student(first_name, last_name, email, campus)
-        self.students.append(student)
-        self.save_students()
-
-    def delete_student(self, student_id):
-        self.students = [s for s in self.students if s.id != student_id]
-        self.save_students()
-
-    # Merge Sort implementation for sorting students
+        with self._lock:
+            records = [s.to_dict() for s in self.students]
+            if self.storage == "binary":
+                write_binary(self.filename, records)
+            else:
+                with atomic_write(self.filename) as file:
+                    json.dump(records, file)
+            if self.journal:
+                self.journal.clear()
+
+    def _rebuild_indexes(self):
+        self.generation += 1
+        for index in self.sorted_indexes.values():
+            index.rebuild(self.students)
+
+    def _index(self, student):
+        self.generation += 1
+        for index in self.sorted_indexes.values():
+            index.add(student)
+
+    def _unindex(self, deleted):
+        self.generation += 1
+        for student in deleted:
+            for index in self.sorted_indexes.values():
+                index.remove(student)
+
+    # Merge Sort implementation for sorting students. The sorted order is cached
+    # as a tuple until the next add or delete; every call returns a new list.
+    # key is a field name or a list of field names, e.g. ["campus", "last_name"]
     def list_students(self, key=None):
-        def merge_sort(lst, key):
-            if len(lst) > 1:
-                mid = len(lst) // 2
-                L = lst[:mid]
-                R = lst[mid:]
-
-                merge_sort(L, key)
-                merge_sort(R, key)
-
-                i = j = k = 0
-
-                while i < len(L) and j < len(R):
-                    if getattr(L[i], key) < getattr(R[j], key):
-                        lst[k] = L[i]
-                        i += 1
-                    else:
-                        lst[k] = R[j]
-                        j += 1
-                    k += 1
-
-                while i < len(L):
-                    lst[k] = L[i]
-                    i += 1
-                    k += 1
-
-                while j < len(R):
-                    lst[k] = R[j]
-                    j += 1
-                    k += 1
-
-        merge_sort(self.students, key)
-        return self.students
-
-    # Binary Search implementation for searching students
+        cache_key = key if isinstance(key, str) else tuple(key)
+        students = self.view_cache.get(cache_key, self.generation)
+        if students is None:
+            students = tuple(sort_students(self.students, key))
+            self.view_cache.put(cache_key, self.generation, students)
+        return list(students)
+
+    # Binary search over the key's sorted index; returns every student with that value
     def search_student(self, key, value):
-        def binary_search(lst, key, value):
-            low = 0
-            high = len(lst) - 1
-            while low <= high:
-                mid = (low + high) // 2
-                if getattr(lst[mid], key) == value:
-                    return lst[mid]
-                elif getattr(lst[mid], key) < value:
-                    low = mid + 1
-                else:
-                    high = mid - 1
-            return None
-
-        # Ensure the list is sorted before searching
-        self.list_students(key)
-        return binary_search(self.students, key, value)
+        index = self.sorted_indexes.get(key)
+        if index is None:
+            return [s for s in self.students if getattr(s, key) == value]
+        return index.lookup(value)
 
 # Functions for Menu Operations (same as before)
 def add_student_menu(db):
@@ -186,9 +201,10 @@ def search_student_menu(db):
 
     if key:
         value = input(f"Enter {key.replace('_', ' ')}: ")
-        student = db.search_student(key, value)
-        if student:
-            print(f"{student.id} - {student.first_name} {student.last_name} - {student.email} - {student.campus}")
+        students = db.search_student(key, value)
+        if students:
+            for student in students:
+                print(f"{student.id} - {student.first_name} {student.last_name} - {student.email} - {student.campus}")
         else:
             print("No student found.")
     else:
@@ -217,6 +233,7 @@ def main():
         elif choice == '4':
             search_student_menu(db)
         elif choice.lower() == 'exit':
+            db.close()
             break
         else:
             print("Invalid choice. Please try again.")
@@ -0,0 +1,163 @@
+import heapq
+import operator
+from itertools import islice
+
+# Filter operators, written as field__operator=value (a bare field means eq)
+OPERATORS = {
+    "eq": operator.eq,
+    "in": lambda value, values: value in values,
+    "prefix": lambda value, prefix: value.startswith(prefix),
+    "gt": operator.gt,
+    "gte": operator.ge,
+    "lt": operator.lt,
+    "lte": operator.le,
+}
+
+RANGE_BOUNDS = {
+    "gt": {"low_inclusive": False},
+    "gte": {},
+    "lt": {"high_inclusive": False},
+    "lte": {},
+}
+
+
+class Predicate:
+    def __init__(self, field, op, value):
+        if op not in OPERATORS:
+            raise ValueError(f"Unknown query operator: {op}")
+        self.field = field
+        self.op = op
+        self.value = set(value) if op == "in" else value
+
+    def matches(self, student):
+        return OPERATORS[self.op](getattr(student, self.field), self.value)
+
+    def __str__(self):
+        value = sorted(self.value) if self.op == "in" else self.value
+        return f"{self.field} {self.op} {value!r}"
+
+
+def parse_filters(filters):
+    predicates = []
+    for name, value in filters.items():
+        field, _, op = name.partition("__")
+        predicates.append(Predicate(field, op or "eq", value))
+    return predicates
+
+
+# How one predicate can be answered from an index, and how many rows it yields
+class Access:
+    def __init__(self, predicate, kind, index, estimate):
+        self.predicate = predicate
+        self.kind = kind
+        self.index = index
+        self.estimate = estimate
+
+    def fetch(self):
+        predicate, index = self.predicate, self.index
+        if predicate.op == "eq":
+            return index.lookup(predicate.value)
+        if predicate.op == "in":
+            # Sorted values keep a sorted index's output in order
+            return [s for value in sorted(predicate.value) for s in index.lookup(value)]
+        if predicate.op == "prefix":
+            return index.prefix(predicate.value)
+        low, high = (None, predicate.value) if predicate.op in ("lt", "lte") else (predicate.value, None)
+        return index.range(low, high, **RANGE_BOUNDS[predicate.op])
+
+    # Yields results in order of the indexed field
+    @property
+    def ordered(self):
+        return self.kind == "sorted"
+
+    def __str__(self):
+        return f"{self.kind} index on {self.predicate}, {self.estimate} rows"
+
+
+def access_for(db, predicate):
+    hash_index = db.indexes.get(predicate.field)
+    sorted_index = db.sorted_indexes.get(predicate.field)
+    if predicate.op == "eq":
+        if hash_index is not None:
+            return Access(predicate, "hash", hash_index, hash_index.count(predicate.value))
+        if sorted_index is not None:
+            return Access(predicate, "sorted", sorted_index, sorted_index.count(predicate.value))
+    elif predicate.op == "in":
+        index = hash_index if hash_index is not None else sorted_index
+        if index is not None:
+            kind = "hash" if index is hash_index else "sorted"
+            return Access(predicate, kind, index, sum(index.count(v) for v in predicate.value))
+    elif sorted_index is not None:
+        if predicate.op == "prefix":
+            estimate = sorted_index.count_prefix(predicate.value)
+        else:
+            low, high = (None, predicate.value) if predicate.op in ("lt", "lte") else (predicate.value, None)
+            estimate = sorted_index.count_range(low, high, **RANGE_BOUNDS[predicate.op])
+        return Access(predicate, "sorted", sorted_index, estimate)
+    return None
+
+
+# The chosen strategy: drive from the most selective index, probe the other hash
+# indexes for membership, and evaluate whatever is left on the candidates
+class QueryPlan:
+    def __init__(self, db, predicates, order_by=None, limit=None):
+        self.db = db
+        self.order_by = order_by
+        self.limit = limit
+        accesses = [a for a in (access_for(db, p) for p in predicates) if a is not None]
+        self.driver = min(accesses, key=lambda a: a.estimate, default=None)
+        if self.driver is None and order_by in db.sorted_indexes:
+            # No usable filter index: walk the order_by index so a limit can stop early
+            self.scan_index = db.sorted_indexes[order_by]
+        else:
+            self.scan_index = None
+        self.probes = [a for a in accesses if a is not self.driver and a.kind == "hash" and a.predicate.op == "eq"]
+        probed = {id(a.predicate) for a in self.probes}
+        if self.driver is not None:
+            probed.add(id(self.driver.predicate))
+        self.filters = [p for p in predicates if id(p) not in probed]
+        self.presorted = order_by is None or self.scan_index is not None or (
+            self.driver is not None and self.driver.ordered and self.driver.predicate.field == order_by
+        )
+
+    def execute(self):
+        if self.driver is not None:
+            students = self.driver.fetch()
+        elif self.scan_index is not None:
+            students = iter(self.scan_index)
+        else:
+            students = self.db.students
+        for probe in self.probes:
+            students = _intersect(students, probe.index, probe.predicate.value)
+        if self.filters:
+            students = _filter(students, self.filters)
+
+        if self.presorted:
+            return list(islice(students, self.limit))
+        key = operator.attrgetter(self.order_by)
+        if self.limit is not None:
+            return heapq.nsmallest(self.limit, students, key=key)
+        return sorted(students, key=key)
+
+    def __str__(self):
+        if self.driver is not None:
+            lines = [f"driver: {self.driver}"]
+        elif self.scan_index is not None:
+            lines = [f"scan: sorted index on {self.order_by}"]
+        else:
+            lines = [f"scan: all {len(self.db.students)} students"]
+        lines += [f"intersect: {probe}" for probe in self.probes]
+        lines += [f"filter: {predicate}" for predicate in self.filters]
+        if self.order_by is not None:
+            lines.append(f"order: by {self.order_by}" + (" (index order)" if self.presorted else ""))
+        if self.limit is not None:
+            lines.append(f"limit: {self.limit}")
+        return "\n".join(lines)
+
+
+def _intersect(students, index, value):
+    return (s for s in students if index.contains(value, s))
+
+
+def _filter(students, predicates):
+    return (s for s in students if all(p.matches(s) for p in predicates))
@@ -0,0 +1,317 @@
+import heapq
+import json
+import operator
+import os
+import sys
+import tempfile
+from bisect import bisect_right
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain, islice
+from student_storage import atomic_write, iter_records
+
+
+# Sorted listings cached per key. Each view is stamped with the database's
+# mutation generation and is only served while that generation is current.
+# Views are evicted least recently used first once their lists exceed max_bytes.
+class SortedViewCache:
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._views = OrderedDict()
+        self._bytes = 0
+
+    def get(self, key, generation):
+        view = self._views.get(key)
+        if view is not None and view[0] == generation:
+            self._views.move_to_end(key)
+            self.hits += 1
+            return view[1]
+        if view is not None:
+            self._discard(key)
+        self.misses += 1
+        return None
+
+    def put(self, key, generation, students):
+        if key in self._views:
+            self._discard(key)
+        size = sys.getsizeof(students)
+        if size > self.max_bytes:
+            return
+        self._views[key] = (generation, students)
+        self._bytes += size
+        while self._bytes > self.max_bytes:
+            oldest = next(iter(self._views))
+            self._discard(oldest)
+            self.evictions += 1
+
+    def _discard(self, key):
+        _, students = self._views.pop(key)
+        self._bytes -= sys.getsizeof(students)
+
+    def clear(self):
+        self._views.clear()
+        self._bytes = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "views": len(self._views),
+            "bytes": self._bytes,
+        }
+
+
+# Runs shorter than this are extended with binary insertion before merging
+MIN_RUN = 256
+
+
+# Stable bottom-up merge sort over student attributes. key is a field name or a
+# list of field names (compared in order). Keys are extracted once into a list
+# kept parallel to the students; natural ascending and strictly descending runs
+# are found first, then runs are merged pairwise, ping-ponging between the input
+# copy and one auxiliary buffer. Returns a new sorted list.
+def merge_sort(students, key):
+    fields = [key] if isinstance(key, str) else list(key)
+    keys = list(map(operator.attrgetter(*fields), students))
+    values = list(students)
+    n = len(values)
+    if n < 2:
+        return values
+
+    bounds = [0]
+    start = 0
+    while start < n:
+        end = start + 1
+        if end < n and keys[end] < keys[start]:
+            while end + 1 < n and keys[end + 1] < keys[end]:
+                end += 1
+            end += 1
+            keys[start:end] = keys[start:end][::-1]
+            values[start:end] = values[start:end][::-1]
+        else:
+            while end < n and not keys[end] < keys[end - 1]:
+                end += 1
+        if end - start < MIN_RUN and end < n:
+            stop = min(start + MIN_RUN, n)
+            run_keys = keys[start:end]
+            run_values = values[start:end]
+            for i in range(end, stop):
+                position = bisect_right(run_keys, keys[i])
+                run_keys.insert(position, keys[i])
+                run_values.insert(position, values[i])
+            keys[start:stop] = run_keys
+            values[start:stop] = run_values
+            end = stop
+        bounds.append(end)
+        start = end
+
+    source_keys, source_values = keys, values
+    target_keys, target_values = [None] * n, [None] * n
+    while len(bounds) > 2:
+        merged = [0]
+        for r in range(0, len(bounds) - 1, 2):
+            low, mid = bounds[r], bounds[r + 1]
+            if r + 2 < len(bounds):
+                high = bounds[r + 2]
+                _merge(source_keys, source_values, target_keys, target_values, low, mid, high)
+            else:
+                high = mid
+                target_keys[low:high] = source_keys[low:high]
+                target_values[low:high] = source_values[low:high]
+            merged.append(high)
+        bounds = merged
+        source_keys, target_keys = target_keys, source_keys
+        source_values, target_values = target_values, source_values
+    return source_values
+
+
+# Merges source[low:mid] and source[mid:high] into target[low:high], taking from
+# the left run on ties to stay stable
+def _merge(source_keys, source_values, target_keys, target_values, low, mid, high):
+    if not source_keys[mid] < source_keys[mid - 1]:
+        target_keys[low:high] = source_keys[low:high]
+        target_values[low:high] = source_values[low:high]
+        return
+    i, j, k = low, mid, low
+    left, right = source_keys[i], source_keys[j]
+    while True:
+        if right < left:
+            target_keys[k] = right
+            target_values[k] = source_values[j]
+            k += 1
+            j += 1
+            if j == high:
+                break
+            right = source_keys[j]
+        else:
+            target_keys[k] = left
+            target_values[k] = source_values[i]
+            k += 1
+            i += 1
+            if i == mid:
+                break
+            left = source_keys[i]
+    if i < mid:
+        target_keys[k:high] = source_keys[i:mid]
+        target_values[k:high] = source_values[i:mid]
+    else:
+        target_keys[k:high] = source_keys[j:high]
+        target_values[k:high] = source_values[j:high]
+
+
+# Keys with at most this many distinct values are bucket sorted
+MAX_BUCKETS = 256
+# Keys sampled to estimate a field's cardinality before collecting them all
+CARDINALITY_SAMPLE = 1024
+
+
+# Stable sort that picks a strategy per field: a bucket (counting) sort when the
+# field has few distinct values and merge_sort otherwise. A list of fields is
+# handled least significant first, relying on each pass being stable.
+def sort_students(students, key):
+    fields = [key] if isinstance(key, str) else list(key)
+    students = list(students)
+    for field in reversed(fields):
+        students = _sort_field(students, field)
+    return students
+
+
+def _sort_field(students, field):
+    keys = list(map(operator.attrgetter(field), students))
+    # An evenly spread sample rules out high-cardinality fields such as IDs and
+    # names without hashing every key
+    step = max(len(keys) // CARDINALITY_SAMPLE, 1)
+    if len(set(keys[::step])) <= MAX_BUCKETS:
+        distinct = set(keys)
+        if len(distinct) <= MAX_BUCKETS:
+            return _bucket_sort(students, keys, distinct)
+    return merge_sort(students, field)
+
+
+def _bucket_sort(students, keys, distinct):
+    buckets = {value: [] for value in sorted(distinct)}
+    appenders = {value: bucket.append for value, bucket in buckets.items()}
+    for value, student in zip(keys, students):
+        appenders[value](student)
+    result = []
+    for bucket in buckets.values():
+        result.extend(bucket)
+    return result
+
+
+# Rough in-memory footprint of one parsed record, used to size external sort
+# chunks. Keys count too: each JSON line parsed on its own gets its own copies.
+def _record_size(record):
+    size = sys.getsizeof(record)
+    for key, value in record.items():
+        size += sys.getsizeof(key) + sys.getsizeof(value)
+        if isinstance(value, list):
+            size += sum(map(sys.getsizeof, value))
+    return size
+
+
+# Splits records into lazy chunks whose records take about budget bytes once
+# loaded. The length is fixed from the average size of the first few records,
+# which is much cheaper than measuring every record; each record also costs a
+# list slot and a sort key while its chunk is sorted. Consume each chunk fully
+# before asking for the next.
+def _chunks(records, budget, sample_size=1000):
+    records = iter(records)
+    sample = list(islice(records, sample_size))
+    if not sample:
+        return
+    per_record = sum(map(_record_size, sample)) / len(sample) + 8 + SORT_KEY_SIZE
+    length = max(int(budget // per_record), 1)
+    records = chain(sample, records)
+    del sample
+    for first in records:
+        yield chain((first,), islice(records, length - 1))
+
+
+# Rough size of the key tuple made for each record while a chunk is sorted
+SORT_KEY_SIZE = 80
+
+
+def _write_lines(path, records):
+    with open(path, 'w') as file:
+        file.writelines(json.dumps(record) + "\n" for record in records)
+
+
+# Spills one chunk to a JSON-lines file as it is read, so the parent never holds it
+def _spill(records, directory):
+    fd, path = tempfile.mkstemp(dir=directory, suffix=".chunk")
+    os.close(fd)
+    _write_lines(path, records)
+    return path
+
+
+# Loads one spilled chunk in a worker process, sorts it and writes it out as a
+# JSON-lines run file
+def _sort_chunk(chunk_path, fields, directory):
+    records = list(_read_run(chunk_path))
+    os.remove(chunk_path)
+    records.sort(key=operator.itemgetter(*fields))
+    fd, path = tempfile.mkstemp(dir=directory, suffix=".run")
+    os.close(fd)
+    _write_lines(path, records)
+    return path
+
+
+def _read_run(path):
+    with open(path, 'r') as file:
+        for line in file:
+            yield json.loads(line)
+
+
+# External merge sort of a JSON array roster that may not fit in memory. The
+# parent streams the file into chunk files on disk without holding the records,
+# and only hands workers the chunk's path. Each worker loads one chunk at a
+# time, sorts it into a temporary run file, and the runs are k-way merged with a
+# heap. Chunks are sized so the records loaded by all workers together stay
+# within memory_budget bytes, on top of each process's own interpreter.
+# Yields the records in order; ties keep their order from the input file.
+def iter_external_sort(filename, key, memory_budget=256 * 1024 * 1024, workers=None, temp_dir=None):
+    fields = [key] if isinstance(key, str) else list(key)
+    workers = workers or os.cpu_count() or 1
+    chunk_budget = max(memory_budget // workers, 1)
+
+    with tempfile.TemporaryDirectory(dir=temp_dir, prefix="student-sort-") as directory:
+        runs = []
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            pending = deque()
+            for chunk in _chunks(iter_records(filename), chunk_budget):
+                path = _spill(chunk, directory)
+                # At most one queued chunk per worker, so spilled chunks don't pile up on disk
+                if len(pending) >= workers:
+                    runs.append(pending.popleft().result())
+                pending.append(pool.submit(_sort_chunk, path, fields, directory))
+            runs.extend(future.result() for future in pending)
+
+        yield from heapq.merge(*map(_read_run, runs), key=operator.itemgetter(*fields))
+
+
+# Writes the externally sorted roster to output as a JSON array; returns the count
+def external_sort(filename, output, key, memory_budget=256 * 1024 * 1024, workers=None, temp_dir=None):
+    encode = json.JSONEncoder().encode
+    records = iter_external_sort(filename, key, memory_budget, workers, temp_dir)
+    count = 0
+    with atomic_write(output) as file:
+        file.write("[")
+        while batch := list(islice(records, 1000)):
+            file.write((", " if count else "") + ", ".join(map(encode, batch)))
+            count += len(batch)
+        file.write("]")
+    return count
+
+
+if __name__ == "__main__":
+    # e.g. python student_sorting.py students.txt sorted.txt campus,last_name 512
+    source, target, keys = sys.argv[1:4]
+    budget = int(sys.argv[4]) * 1024 * 1024 if len(sys.argv) > 4 else 256 * 1024 * 1024
+    print(f"Sorted {external_sort(source, target, keys.split(','), budget)} records into {target}")
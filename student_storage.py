@@ -0,0 +1,566 @@
+import gc
+import json
+import os
+import stat
+import struct
+import sys
+import tempfile
+import threading
+from array import array
+from contextlib import contextmanager
+from itertools import accumulate, repeat
+from student_index import IdAllocator
+
+
+# Writes to a temporary file next to the target and renames it into place, so a
+# crash mid-write leaves the previous file intact. The new file keeps the old
+# one's permissions, or gets the usual umask-based ones if there was none.
+@contextmanager
+def atomic_write(filename, mode='w'):
+    directory = os.path.dirname(os.path.abspath(filename))
+    fd, temp_name = tempfile.mkstemp(dir=directory, prefix=os.path.basename(filename) + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, mode) as file:
+            yield file
+            file.flush()
+            os.fsync(file.fileno())
+        os.chmod(temp_name, _file_mode(filename))
+        os.replace(temp_name, filename)
+    except BaseException:
+        try:
+            os.remove(temp_name)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+def _file_mode(filename):
+    try:
+        return stat.S_IMODE(os.stat(filename).st_mode)
+    except FileNotFoundError:
+        # mkstemp creates 0600; a plain open() would have used 0666 less the umask
+        umask = os.umask(0)
+        os.umask(umask)
+        return 0o666 & ~umask
+
+
+# Background thread that coalesces change notifications and calls save at most
+# once per interval. flush() and close() wait for pending changes to be written.
+# A failed background save keeps the changes pending for the next attempt, and
+# its error is raised once from the next notify(), flush() or close().
+class WriteBehindSaver:
+    def __init__(self, save, interval=1.0):
+        self.save = save
+        self.interval = interval
+        self._error = None
+        self._dirty = False
+        self._closed = False
+        self._condition = threading.Condition()
+        self._save_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+        self._thread.start()
+
+    # raise_error=False leaves a stored error for later, e.g. while another exception propagates
+    def notify(self, raise_error=True):
+        with self._condition:
+            self._dirty = True
+            self._condition.notify()
+        if raise_error:
+            self._raise_error()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._dirty or self._closed)
+                if self._closed:
+                    return
+            try:
+                self._save_pending()
+            except Exception as error:
+                with self._condition:
+                    self._error = error
+            # Changes made in the meantime are saved together after the interval
+            with self._condition:
+                self._condition.wait_for(lambda: self._closed, self.interval)
+
+    # Saves first, so an earlier failure is still reported after a successful retry
+    def flush(self):
+        self._save_pending()
+        self._raise_error()
+
+    def _raise_error(self):
+        with self._condition:
+            error, self._error = self._error, None
+        if error is not None:
+            raise error
+
+    def _save_pending(self):
+        with self._save_lock:
+            with self._condition:
+                if not self._dirty:
+                    return
+                self._dirty = False
+            try:
+                self.save()
+            except BaseException:
+                with self._condition:
+                    self._dirty = True
+                raise
+
+    def close(self):
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        self._thread.join()
+        self.flush()
+
+
+# Append-only log of StudentDatabase mutations, replayed on top of the snapshot.
+# Replay is idempotent (an add whose ID is already present is skipped), so a
+# crash between writing a compacted snapshot and clearing the log loses nothing
+# and duplicates nothing.
+class StudentJournal:
+    def __init__(self, filename, compact_threshold=1024 * 1024):
+        self.filename = filename
+        self.compact_threshold = compact_threshold
+
+    # Appends one mutation and reports whether the log has grown past the threshold
+    def append(self, op, data):
+        return self.append_many([(op, data)])
+
+    def append_many(self, entries):
+        with open(self.filename, 'a') as file:
+            file.write("".join(json.dumps({"op": op, "data": data}) + "\n" for op, data in entries))
+            return file.tell() >= self.compact_threshold
+
+    def replay(self, students, factory):
+        try:
+            file = open(self.filename, 'r')
+        except FileNotFoundError:
+            return students
+
+        by_id = {}
+        for student in students:
+            by_id.setdefault(student.id, []).append(student)
+
+        deleted = set()
+        with file:
+            for line in file:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # A torn final line from an interrupted append
+                    break
+                if entry["op"] == "add":
+                    # Already in the snapshot: a compaction saved it and stopped
+                    # before clearing the log, so replaying it again is a no-op
+                    if by_id.get(entry["data"]["id"]):
+                        continue
+                    student = factory(**entry["data"])
+                    students.append(student)
+                    by_id.setdefault(student.id, []).append(student)
+                elif entry["op"] == "delete":
+                    for student in by_id.pop(entry["data"], []):
+                        deleted.add(id(student))
+
+        if not deleted:
+            return students
+        return [s for s in students if id(s) not in deleted]
+
+    def clear(self):
+        try:
+            os.remove(self.filename)
+        except FileNotFoundError:
+            pass
+
+
+# Loading, ID upkeep, batching and persistence shared by the file-backed student
+# databases. A database calls _open() from __init__ and _start_saver() once its
+# indexes are built, and supplies:
+#   student_class    the Student type it stores
+#   _read_students() the students in the data file, without the journal
+#   save_students()  rewrites the data file, holding _lock
+#   search_student(key, value), _index(student), _unindex(students), _rebuild_indexes()
+class PersistentRoster:
+    def _open(self, filename, journal, compact_threshold):
+        self.filename = filename
+        # With a journal, mutations are appended to a log instead of rewriting the file
+        self.journal = StudentJournal(filename + ".journal", compact_threshold) if journal else None
+        # Mutations made inside batch(), persisted together when it exits
+        self._pending = None
+        # Mutations and saves share one lock, so the write-behind thread never saves a roster mid-change
+        self._lock = threading.RLock()
+        self._saver = None
+        # Unique IDs for new students. Repeated IDs already on disk are renamed in
+        # memory only; the file picks the new IDs up with the next change saved.
+        self.ids = IdAllocator()
+        self.students = self.load_students()
+        self._claim_ids(self.students)
+
+    # With write_behind (seconds), saves happen on a background thread at most once per interval
+    def _start_saver(self, write_behind):
+        if write_behind is not None:
+            self._saver = WriteBehindSaver(self._save_behind, write_behind)
+
+    def load_students(self):
+        try:
+            students = self._read_students()
+        except FileNotFoundError:
+            students = []
+        if self.journal:
+            # Logged changes name students by their IDs after renaming
+            self._claim_ids(students)
+            students = self.journal.replay(students, self.student_class)
+        return students
+
+    # Saves for the write-behind thread; an open batch saves when it exits or rolls back
+    def _save_behind(self):
+        with self._lock:
+            if self._pending is None:
+                self.save_students()
+
+    # Registers every student's ID, suffixing repeats in file order; returns the
+    # students that were renamed
+    def _claim_ids(self, students):
+        renamed = []
+        for student, student_id in zip(students, self.ids.rebuild(s.id for s in students)):
+            if student.id != student_id:
+                student.id = student_id
+                renamed.append(student)
+        return renamed
+
+    def add_student(self, first_name, last_name, email, campus):
+        student = self.student_class(first_name, last_name, email, campus)
+        with self._lock:
+            student.id = self.ids.allocate(student.id)
+            self.students.append(student)
+            self._index(student)
+            self._persist("add", student.to_dict())
+
+    # IDs are unique, so this removes at most one student. An unknown ID changes
+    # nothing and writes nothing.
+    def delete_student(self, student_id):
+        with self._lock:
+            deleted = self.search_student("id", student_id)
+            if not deleted:
+                return
+            for student in deleted:
+                self.students.remove(student)
+                self.ids.release(student.id)
+            self._unindex(deleted)
+            self._persist("delete", student_id)
+
+    def add_students(self, students):
+        with self.batch():
+            for first_name, last_name, email, campus in students:
+                self.add_student(first_name, last_name, email, campus)
+
+    def delete_students(self, student_ids):
+        student_ids = set(student_ids)
+        with self._lock, self.batch():
+            deleted = {s for student_id in student_ids for s in self.search_student("id", student_id)}
+            if not deleted:
+                return
+            self.students = [s for s in self.students if s not in deleted]
+            for student in deleted:
+                self.ids.release(student.id)
+                self._persist("delete", student.id)
+            self._unindex(deleted)
+
+    # Applies every change in memory and saves once on exit, or rolls them all back
+    # if the block raises. A nested batch joins the outer one.
+    @contextmanager
+    def batch(self):
+        if self._pending is not None:
+            yield self
+            return
+        with self._lock:
+            saved = list(self.students)
+            self._pending = []
+        try:
+            yield self
+        except BaseException:
+            with self._lock:
+                self._pending = None
+                self._restore(saved)
+                # The write-behind thread skips saves while a batch is open; catch up on earlier changes
+                if self._saver:
+                    self._saver.notify(raise_error=False)
+            raise
+        with self._lock:
+            pending, self._pending = self._pending, None
+            if pending:
+                self._persist_many(pending)
+            elif self._saver:
+                self._saver.notify()
+
+    # Puts the roster back as it was when a batch started
+    def _restore(self, students):
+        self.students = students
+        self.ids.rebuild(s.id for s in students)
+        self._rebuild_indexes()
+
+    def _persist(self, op, data):
+        if self._pending is not None:
+            self._pending.append((op, data))
+        else:
+            self._persist_many([(op, data)])
+
+    # Saves the whole file, or appends to the journal and compacts once it grows too large
+    def _persist_many(self, entries):
+        if self._saver:
+            self._saver.notify()
+        elif self.journal is None or self.journal.append_many(entries):
+            self.save_students()
+
+    # Blocks until every change so far is on disk
+    def flush(self):
+        if self._saver:
+            self._saver.flush()
+
+    def close(self):
+        if self._saver:
+            self._saver.close()
+
+
+# Shares one string object between every record with the same value, so a
+# campus or a common surname loaded a million times is stored once. Equal
+# interned values are also identical, which lets == return on the identity check.
+class SymbolTable:
+    def __init__(self):
+        self._symbols = {}
+        self.lookups = 0
+        self.saved_bytes = 0
+
+    def intern(self, value):
+        self.lookups += 1
+        symbol = self._symbols.setdefault(value, value)
+        if symbol is not value:
+            self.saved_bytes += sys.getsizeof(value)
+        return symbol
+
+    def intern_all(self, values):
+        return list(map(self.intern, values))
+
+    def stats(self):
+        return {
+            "symbols": len(self._symbols),
+            "lookups": self.lookups,
+            "duplicates": self.lookups - len(self._symbols),
+            "saved_bytes": self.saved_bytes,
+        }
+
+
+# Fields that repeat across records often enough to intern. Emails are unique per
+# student, and a Python str cannot share its domain with another string.
+INTERNED_FIELDS = ("first_name", "last_name", "campus")
+
+# Symbol table shared by the student loaders
+SYMBOLS = SymbolTable()
+
+
+def intern_record(record, symbols=SYMBOLS):
+    for field in INTERNED_FIELDS:
+        record[field] = symbols.intern(record[field])
+    return record
+
+
+def intern_columns(columns, symbols=SYMBOLS):
+    for field in INTERNED_FIELDS:
+        columns[field] = symbols.intern_all(columns[field])
+    return columns
+
+
+# Fields of a saved student record, in the order a database Student takes them
+RECORD_FIELDS = ("first_name", "last_name", "email", "campus", "id", "enrolled_courses")
+
+
+# Yields factory(**record) for each saved student while the file is still being read
+def iter_students(path, factory):
+    for record in iter_records(path):
+        yield factory(**intern_record(record))
+
+
+# Builds students from one list per field, as read_binary_columns returns them
+def students_from_columns(columns, factory):
+    columns = intern_columns(columns)
+    with gc_paused():
+        return list(map(factory, *(columns[field] for field in RECORD_FIELDS)))
+
+
+# Parses a JSON array file one element at a time instead of loading it whole
+def iter_records(filename, chunk_size=64 * 1024):
+    decoder = json.JSONDecoder()
+    with open(filename, 'r') as file:
+        buffer = ""
+        pos = 0
+        started = False
+        while True:
+            while pos < len(buffer) and buffer[pos] in " \t\r\n":
+                pos += 1
+            if pos == len(buffer):
+                chunk = file.read(chunk_size)
+                if not chunk:
+                    raise ValueError(f"Unexpected end of file in {filename}")
+                buffer, pos = chunk, 0
+                continue
+
+            char = buffer[pos]
+            if not started:
+                if char != '[':
+                    raise ValueError(f"Expected a JSON array in {filename}")
+                started = True
+                pos += 1
+            elif char == ']':
+                return
+            elif char == ',':
+                pos += 1
+            else:
+                try:
+                    record, end = decoder.raw_decode(buffer, pos)
+                except ValueError:
+                    end = None
+                # A complete element is followed by "," or "]". Reaching the end of
+                # the buffer first, or any other character, means it may go on in
+                # the next chunk: a number cut at the boundary decodes as a shorter one
+                if end is not None:
+                    after = end
+                    while after < len(buffer) and buffer[after] in " \t\r\n":
+                        after += 1
+                    if after < len(buffer) and buffer[after] in ",]":
+                        pos = end
+                        yield record
+                        continue
+                chunk = file.read(chunk_size)
+                if not chunk:
+                    raise ValueError(f"Malformed or truncated JSON array in {filename}")
+                buffer, pos = buffer[pos:] + chunk, 0
+
+
+# Binary snapshot format: a header with the record count and section offsets,
+# followed by one column per field. Text columns are length-prefixed (a table of
+# character lengths, then the UTF-8 text), and campus is stored as codes into a
+# per-file string table. Each string is also NUL-terminated so a column can be
+# decoded with a single split when no value contains a NUL.
+BINARY_MAGIC = b"STDB"
+BINARY_VERSION = 1
+BINARY_HEADER = struct.Struct("<4sHI")
+TEXT_FIELDS = ("first_name", "last_name", "email", "id")
+SECTION_COUNT = len(TEXT_FIELDS) + 4
+
+
+# Only strings round-trip, so None or a number in a text field is rejected
+# rather than written as something that reads back differently
+def _pack_text(values, field):
+    if not all(map(isinstance, values, repeat(str))):
+        value = next(v for v in values if not isinstance(v, str))
+        raise ValueError(f"Binary storage needs text in {field}, got {value!r}")
+    lengths = array('I', map(len, values))
+    return lengths.tobytes() + "".join([v + "\0" for v in values]).encode('utf-8')
+
+
+def _unpack_text(data, count):
+    lengths = array('I')
+    lengths.frombytes(data[:count * lengths.itemsize])
+    text = data[count * lengths.itemsize:].decode('utf-8')
+    values = text.split("\0")
+    if len(values) == count + 1:
+        values.pop()
+        return values
+    # Some value contains a NUL itself, so walk the length table instead
+    offsets = list(accumulate([n + 1 for n in lengths], initial=0))
+    return [text[start:end - 1] for start, end in zip(offsets, offsets[1:])]
+
+
+def write_binary(filename, records):
+    records = list(records)
+    count = len(records)
+    sections = [_pack_text([r[field] for r in records], field) for field in TEXT_FIELDS]
+
+    campus_table = {}
+    codes = array('H', [campus_table.setdefault(r["campus"], len(campus_table)) for r in records])
+    sections.append(codes.tobytes())
+    sections.append(struct.pack("<I", len(campus_table)) + _pack_text(list(campus_table), "campus"))
+
+    course_counts = array('I', [len(r.get("enrolled_courses") or ()) for r in records])
+    sections.append(course_counts.tobytes())
+    sections.append(_pack_text([c for r in records for c in r.get("enrolled_courses") or ()], "enrolled_courses"))
+
+    offsets = []
+    position = BINARY_HEADER.size + 8 * (SECTION_COUNT + 1)
+    for section in sections:
+        offsets.append(position)
+        position += len(section)
+    offsets.append(position)
+
+    with atomic_write(filename, 'wb') as file:
+        file.write(BINARY_HEADER.pack(BINARY_MAGIC, BINARY_VERSION, count))
+        file.write(array('Q', offsets).tobytes())
+        for section in sections:
+            file.write(section)
+
+
+# Bulk loads allocate millions of containers; pausing the cyclic collector
+# keeps it from rescanning the growing heap over and over
+@contextmanager
+def gc_paused():
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def read_binary_columns(filename):
+    with gc_paused():
+        return _read_binary_columns(filename)
+
+
+def _read_binary_columns(filename):
+    with open(filename, 'rb') as file:
+        data = file.read()
+    magic, version, count = BINARY_HEADER.unpack_from(data)
+    if magic != BINARY_MAGIC or version != BINARY_VERSION:
+        raise ValueError(f"{filename} is not a student binary file")
+    offsets = array('Q')
+    offsets.frombytes(data[BINARY_HEADER.size:BINARY_HEADER.size + 8 * (SECTION_COUNT + 1)])
+    sections = [data[start:end] for start, end in zip(offsets, offsets[1:])]
+
+    columns = {field: _unpack_text(sections[i], count) for i, field in enumerate(TEXT_FIELDS)}
+
+    codes = array('H')
+    codes.frombytes(sections[len(TEXT_FIELDS)])
+    table_data = sections[len(TEXT_FIELDS) + 1]
+    campus_table = _unpack_text(table_data[4:], struct.unpack_from("<I", table_data)[0])
+    columns["campus"] = list(map(campus_table.__getitem__, codes))
+
+    course_counts = array('I')
+    course_counts.frombytes(sections[len(TEXT_FIELDS) + 2])
+    courses = _unpack_text(sections[len(TEXT_FIELDS) + 3], sum(course_counts))
+    if courses:
+        offsets = list(accumulate(course_counts, initial=0))
+        columns["enrolled_courses"] = [courses[start:end] for start, end in zip(offsets, offsets[1:])]
+    else:
+        columns["enrolled_courses"] = [[] for _ in range(count)]
+    return columns
+
+
+def read_binary(filename):
+    columns = read_binary_columns(filename)
+    fields = list(columns)
+    with gc_paused():
+        return [dict(zip(fields, row)) for row in zip(*columns.values())]
+
+
+def json_to_binary(json_filename, binary_filename):
+    write_binary(binary_filename, iter_records(json_filename))
+
+
+def binary_to_json(binary_filename, json_filename):
+    with open(json_filename, 'w') as file:
+        json.dump(read_binary(binary_filename), file)
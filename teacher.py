@@ -9,5 +9,6 @@ class Teacher:
     def make_announcement(self, announcement):
         if self.course:
             print(f"Announcement from {self.name}: {announcement}")
+            self.course.announcements.append(announcement)
             for student in self.course.enrolled_students:
                 student.receive_announcement(announcement)
\ No newline at end of file
@@ -1,59 +1,178 @@
+import heapq
+import json
+import operator
+from itertools import islice
+from course import Course
+from enrollment import EnrollmentGraph
 from student import Student
+from student_index import HashIndex, IdAllocator, SortedIndex, TrigramIndex, full_name
+from student_storage import atomic_write, iter_records
+from teacher import Teacher
 
 class TeachingModule:
-    def __init__(self):
+    # Search keys mapped to the Student attribute they read
+    attributes = {
+        "id": "student_id", "first_name": "first_name", "last_name": "last_name", "email": "email", "campus": "campus"
+    }
+    # Keys kept in a hash index for search_student; add_index declares more,
+    # e.g. campus
+    indexed_fields = ("id", "first_name", "last_name", "email")
+    # Keys kept in a sorted index, for search_prefix and paged list_students;
+    # add_sorted_index declares more
+    sorted_fields = ("id", "first_name", "last_name", "email", "campus")
+    # Fields search_fuzzy accepts, mapped to the text their trigram index covers
+    fuzzy_fields = {"name": full_name, "email": operator.attrgetter("email")}
+
+    def __init__(self, enrollments=None):
+        # Enrollment graph of the module; add_course and register_student move
+        # courses and students onto it
+        self.enrollments = enrollments if enrollments is not None else EnrollmentGraph()
         self.teachers = []
         self.courses = []
-        self.students = []
+        # Registered students in registration order, as a dict used as a set, and
+        # the same students keyed by ID
+        self.students = {}
+        self.students_by_id = {}
+        # Unique student IDs; a repeated ID is suffixed when the student is registered
+        self.ids = IdAllocator()
+        self.indexes = {key: HashIndex(self.attributes[key]) for key in self.indexed_fields}
+        self.sorted_indexes = {key: SortedIndex(self.attributes[key]) for key in self.sorted_fields}
+        # Trigram indexes for search_fuzzy, built the first time a field is searched
+        self.fuzzy_indexes = {}
 
     def add_course(self, course):
+        self._attach(course, course.enrolled_students)
         self.courses.append(course)
 
+    # Points a course or student at the module's graph. One that already has
+    # enrollments in another graph is rejected rather than split across two.
+    def _attach(self, member, enrolled):
+        if member.enrollments is self.enrollments:
+            return
+        if enrolled:
+            raise ValueError(f"{member} already has enrollments in a different enrollment graph")
+        member.enrollments = self.enrollments
+
     def add_teacher(self, teacher):
         self.teachers.append(teacher)
 
     def add_student(self, first_name, last_name, email, campus):
-        new_student = Student(first_name, last_name, email, campus)
-        self.students.append(new_student)
+        new_student = Student(first_name, last_name, email, campus, enrollments=self.enrollments)
+        self.register_student(new_student)
+
+    # Adds an already built student, e.g. one loaded from students.txt
+    def register_student(self, student):
+        self._attach(student, student.enrolled_courses)
+        student.student_id = self.ids.allocate(student.student_id)
+        self.students[student] = None
+        self.students_by_id[student.student_id] = student
+        for index in self._all_indexes():
+            index.add(student)
+
+    def _all_indexes(self):
+        return [*self.indexes.values(), *self.sorted_indexes.values(), *self.fuzzy_indexes.values()]
+
+    def add_index(self, key, attribute=None):
+        index = HashIndex(attribute or self.attributes.get(key, key))
+        index.rebuild(self.students)
+        self.indexes[key] = index
+
+    def add_sorted_index(self, key, attribute=None):
+        index = SortedIndex(attribute or self.attributes.get(key, key))
+        index.rebuild(self.students)
+        self.sorted_indexes[key] = index
     
     def delete_student(self, student_id):
-        student_to_delete = next((s for s in self.students if s.student_id == student_id), None)
-        if student_to_delete:
-            self.students.remove(student_to_delete)
+        if self._remove_student(student_id):
             print(f"Student with ID {student_id} has been deleted.")
         else:
             print(f"No student found with ID {student_id}.")
+
+    # Deletes every listed student in one pass; returns how many were found
+    def delete_students(self, student_ids):
+        return sum(1 for student_id in student_ids if self._remove_student(student_id))
+
+    # Drops a student from the registry, the indexes and every course they are
+    # enrolled in, following the graph's student-to-course links: O(1 + their
+    # courses) apart from index upkeep
+    def _remove_student(self, student_id):
+        student = self.students_by_id.pop(student_id, None)
+        if student is None:
+            return None
+        del self.students[student]
+        self.ids.release(student_id)
+        self.enrollments.remove_student(student)
+        for index in self._all_indexes():
+            index.remove(student)
+        return student
         
-    def list_students(self, sort_by):
-        if sort_by == 'id':
-            sorted_students = sorted(self.students, key=lambda s: s.student_id)
-        elif sort_by == 'first_name':
-            sorted_students = sorted(self.students, key=lambda s: s.first_name)
-        elif sort_by == 'last_name':
-            sorted_students = sorted(self.students, key=lambda s: s.last_name)
-        elif sort_by == 'campus':
-            sorted_students = sorted(self.students, key=lambda s: s.campus)
+    # Reads the key's sorted index; start_after (the last student of the previous
+    # page), limit and an inclusive low/high range select a single page
+    def list_students(self, sort_by, start_after=None, limit=None, low=None, high=None):
+        index = self.sorted_indexes.get(sort_by)
+        if index is not None:
+            sorted_students = list(islice(index.range(low, high, after=start_after), limit))
         else:
             print("Invalid sorting key. Showing unsorted list.")
-            sorted_students = self.students
+            sorted_students = list(self.students)
 
         return sorted_students
     
+    # The first k students by key (the last k when reverse), read off the sorted index
+    def top_k(self, key, k, reverse=False):
+        index = self.sorted_indexes.get(key)
+        if index is not None:
+            return list(islice(index.descending() if reverse else index, k))
+        select = heapq.nlargest if reverse else heapq.nsmallest
+        return select(k, self.students, key=operator.attrgetter(self.attributes.get(key, key)))
+
+    def nsmallest(self, k, key):
+        return self.top_k(key, k)
+
+    def nlargest(self, k, key):
+        return self.top_k(key, k, reverse=True)
+
     def search_student(self, key, value):
-        if key == "id":
-            return [student for student in self.students if student.student_id == value]
-        elif key == "first_name":
-            return [student for student in self.students if student.first_name == value]
-        elif key == "last_name":
-            return [student for student in self.students if student.last_name == value]
-        else:
+        index = self.indexes.get(key)
+        if index is not None:
+            return index.lookup(value)
+        if key not in self.attributes:
             return []
+        attribute = self.attributes[key]
+        return [s for s in self.students if getattr(s, attribute) == value]
+
+    # Type-ahead lookup: the first limit students whose key starts with prefix
+    def search_prefix(self, key, prefix, limit=10):
+        index = self.sorted_indexes.get(key)
+        if index is not None:
+            return index.prefix(prefix, limit)
+        if key not in self.attributes:
+            return []
+        attribute = self.attributes[key]
+        matches = [s for s in self.students if getattr(s, attribute).startswith(prefix)]
+        return sorted(matches, key=lambda s: getattr(s, attribute))[:limit]
+
+    # Misspelling-tolerant search over "name" (first and last) or "email",
+    # best matches first
+    def search_fuzzy(self, value, field="name", limit=10):
+        index = self.fuzzy_indexes.get(field)
+        if index is None:
+            index = TrigramIndex(self.fuzzy_fields[field])
+            index.rebuild(self.students)
+            self.fuzzy_indexes[field] = index
+        return index.search(value, limit)
 
     def enroll_student_in_course(self, student, course):
         if course in self.courses and student in self.students:
             course.enroll_student(student)
             print(f"{student.first_name} {student.last_name} has been enrolled in {course.title}")
 
+    # Enrolls many registered students in one course at once; returns how many were new
+    def enroll_students_in_course(self, students, course):
+        if course not in self.courses:
+            return 0
+        return course.enroll_students(s for s in students if s in self.students)
+
     def notify_teachers(self, message):
         for teacher in self.teachers:
             if teacher.course:
@@ -90,8 +209,65 @@ class TeachingModule:
         else:
             print("No students enrolled.")
 
-    def assign_courses_to_students(self):
-        from random import choice
-        for student in self.students:
-            course = choice(self.courses)
-            self.enroll_student_in_course(student, course)
\ No newline at end of file
+    # Draws a course for every student in one vectorized pass (see
+    # course_assignment) and enrolls each course's draw in bulk. capacities caps
+    # a course's total roster, affinity weights courses per campus, and seed makes
+    # the draw reproducible. Returns the students that found no free seat.
+    def assign_courses_to_students(self, students=None, capacities=None, affinity=None, seed=None):
+        from course_assignment import assign_courses
+        students = self.students if students is None else [s for s in students if s in self.students]
+        free_seats = {
+            course: max(capacity - len(course.enrolled_students), 0)
+            for course, capacity in (capacities or {}).items() if capacity is not None
+        }
+        assignment, unassigned = assign_courses(students, self.courses, free_seats, affinity, seed)
+        for course, enrolled in assignment.items():
+            if enrolled:
+                course.enroll_students(enrolled)
+                print(f"{len(enrolled)} students have been enrolled in {course.title}")
+        if unassigned:
+            print(f"{len(unassigned)} students could not be placed: every open course is full")
+        return unassigned
+
+    # Restores courses, teachers and enrollments saved by save_courses. Courses are
+    # matched by title, and student IDs are resolved through the ID registry.
+    def load_courses(self, filename):
+        try:
+            records = list(iter_records(filename))
+        except FileNotFoundError:
+            return
+        courses_by_title = {c.title: c for c in self.courses}
+        teachers_by_name = {t.name: t for t in self.teachers}
+
+        for record in records:
+            course = courses_by_title.get(record["title"])
+            if course is None:
+                course = Course(record["title"], record["name"], self.enrollments)
+                self.add_course(course)
+                courses_by_title[course.title] = course
+            for name in record.get("teachers", []):
+                teacher = teachers_by_name.get(name)
+                if teacher is None:
+                    teacher = Teacher(name)
+                    self.add_teacher(teacher)
+                    teachers_by_name[name] = teacher
+                course.assign_teacher(teacher)
+            students_by_id = self.students_by_id
+            course.enroll_students(
+                students_by_id[student_id] for student_id in record.get("students", []) if student_id in students_by_id
+            )
+            course.announcements.extend(record.get("announcements", []))
+
+    def save_courses(self, filename):
+        records = [
+            {
+                "title": course.title,
+                "name": course.name,
+                "students": [s.student_id for s in course.enrolled_students],
+                "teachers": [course.teacher.name] if course.teacher else [],
+                "announcements": course.announcements
+            }
+            for course in self.courses
+        ]
+        with atomic_write(filename) as file:
+            json.dump(records, file, indent=4)
\ No newline at end of file